@@ -1,16 +1,33 @@
 #!/usr/bin/env python
 import os
 import sys
+import ijson
 import json
+import re
+import time
 
 sys.path.append(os.path.join(os.path.join(sys.path[0], '..', '..', '..'), 'utils'))
 
 from liferay.teams.headless.headless_contstants import Filter, HeadlessStrings
-from utils.liferay_utils.jira_utils.jira_constants import Status, Strings
+from utils.liferay_utils.jira_utils.jira_constants import CustomField, Status, Strings
 from utils.liferay_utils.jira_utils.jira_helpers import create_poshi_automation_task_for, \
-    close_functional_automation_subtask, create_investigation_task_for
+    close_functional_automation_subtask, create_investigation_tasks_for, get_investigation_task_fields, get_issues_by_keys
 from utils.liferay_utils.jira_utils.jira_liferay import get_jira_connection
 
+# Only request the fields each loop reads; maxResults=False lets the client page through every result
+INVESTIGATION_TASK_FIELDS = 'summary'
+SUBTASK_UPDATE_FIELDS = 'summary,subtasks,status'
+POSHI_STORY_FIELDS = 'summary,subtasks,issuelinks,components,' + CustomField.Epic_Link
+
+INVESTIGATION_SUMMARY_PREFIX = '[HL] Investigate failure in '
+
+# On-disk {key: summary} cache of the investigation tasks filter, pruned every run and fully rebuilt once a day
+INVESTIGATION_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.investigation_tasks_cache.json')
+INVESTIGATION_CACHE_MAX_AGE_SECONDS = 24 * 60 * 60
+
+# Header of the test scenarios table, which runs up to the Exploratory testing section (or the end)
+POSHI_TABLE_HEADER_RE = re.compile(r'\|\|\*?Requirement\*?\|\|')
+
 
 def _create_poshi_task_for(jira_local, parent_story, poshi_automation_table):
     parent_key = parent_story.key
@@ -27,6 +44,95 @@ def _create_poshi_task_for(jira_local, parent_story, poshi_automation_table):
         print("Poshi task ", new_issue.key, " created for", parent_key)
     return new_issue
 
+def _assign_to_support_qa(jira, subtask):
+    # Issue.update() reloads the whole issue, so the assignee is already in memory without another GET
+    assignee = getattr(subtask.fields, 'assignee', None)
+    if assignee is None or assignee.displayName != 'Support QA':
+        jira.assign_issue(subtask.id, 'support-qa')
+
+
+def _is_recent_investigation_cache(cache, jql, now):
+    """True if cache was written by this code for this jql, with a full sync less than a day old."""
+    return (
+        isinstance(cache, dict)
+        and cache.get('jql') == jql
+        and isinstance(cache.get('full_sync'), (int, float))
+        and isinstance(cache.get('sync'), (int, float))
+        and isinstance(cache.get('tasks'), dict)
+        and now - cache['full_sync'] < INVESTIGATION_CACHE_MAX_AGE_SECONDS
+    )
+
+
+def _load_investigation_tasks(jira_local):
+    """
+    Return {key: summary} for Filter.Investigation_Testing_Tasks.
+    With a recent cache only the tasks updated since the last sync are fetched with their
+    summary, plus a key-only search of the whole filter to drop the tasks that left it;
+    the full search runs once a day.
+    """
+    jql = Filter.Investigation_Testing_Tasks
+    now = time.time()
+    cache = None
+    if os.path.isfile(INVESTIGATION_CACHE_FILE):
+        # An unreadable, corrupt or foreign cache just means a full sync
+        try:
+            with open(INVESTIGATION_CACHE_FILE, "r") as file:
+                cache = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            cache = None
+
+    if _is_recent_investigation_cache(cache, jql, now):
+        # Relative JQL dates avoid timezone mismatches; one extra minute covers clock skew
+        minutes_since_sync = int((now - cache['sync']) // 60) + 1
+        search_jql = f"{jql} AND updated >= -{minutes_since_sync}m"
+        full_sync = cache['full_sync']
+        current_keys = {task.key for task in jira_local.search_issues(jql, maxResults=False, fields='key')}
+        tasks = {key: summary for key, summary in cache['tasks'].items() if key in current_keys}
+    else:
+        search_jql = jql
+        full_sync = now
+        current_keys = None
+        tasks = {}
+
+    for task in jira_local.search_issues(search_jql, maxResults=False, fields=INVESTIGATION_TASK_FIELDS):
+        tasks[task.key] = task.fields.summary
+
+    if current_keys is not None:
+        # Tasks that entered the filter without being updated are not in the delta
+        missing_keys = current_keys - tasks.keys()
+        for key, task in get_issues_by_keys(jira_local, missing_keys, fields=INVESTIGATION_TASK_FIELDS).items():
+            tasks[key] = task.fields.summary
+
+    # Written to a temp file and renamed, so an interrupted run never leaves a truncated cache
+    tmp_file = INVESTIGATION_CACHE_FILE + ".tmp"
+    with open(tmp_file, "w") as file:
+        json.dump({'jql': jql, 'full_sync': full_sync, 'sync': now, 'tasks': tasks}, file)
+    os.replace(tmp_file, INVESTIGATION_CACHE_FILE)
+    return tasks
+
+
+def _index_investigation_tasks(investigation_tasks):
+    """
+    Index {key: summary} tasks whose summary follows INVESTIGATION_SUMMARY_PREFIX by case name;
+    any other summaries are kept as (summary, key) pairs for a substring check.
+    """
+    tasks_by_case_name = {}
+    untemplated_tasks = []
+    for key, summary in investigation_tasks.items():
+        if summary.startswith(INVESTIGATION_SUMMARY_PREFIX):
+            tasks_by_case_name.setdefault(summary[len(INVESTIGATION_SUMMARY_PREFIX):].strip(), key)
+        else:
+            untemplated_tasks.append((summary, key))
+    return tasks_by_case_name, untemplated_tasks
+
+
+def _find_investigation_task(testray_case_name, tasks_by_case_name, untemplated_tasks):
+    existing_key = tasks_by_case_name.get(testray_case_name)
+    if existing_key:
+        return existing_key
+    return next((key for summary, key in untemplated_tasks if testray_case_name in summary), None)
+
+
 def create_investigation_task(jira_local):
     """
     Create or find an investigation task in JIRA based on Testray test results.
@@ -37,120 +143,128 @@ def create_investigation_task(jira_local):
     """
     json_file_path = "/home/me/Projects/eng/testray_json/failed-tests.json"
 
-    with open(json_file_path, "r") as file:
-        data = json.load(file)
-
-    test_result_items = data.get("items", [])
-    created_issues = []
+    # New tasks are collected here and created with bulk requests once the file is read
+    new_task_fields = []
+    queued_case_names = set()
 
     # Search existing investigation tasks
-    investigation_tasks = jira_local.search_issues(Filter.Investigation_Testing_Tasks)
-
-    for test_result in test_result_items:
-        testray_case_name = test_result["testrayCaseName"]
-        testray_component_name = test_result["testrayComponentName"]
-        testray_case_type_name = test_result["testrayCaseTypeName"]
-        testray_run_name = test_result["testrayRunName"]
-        error = test_result["error"]
-        testray_case_result_id = test_result["testrayCaseResultId"]
-
-        # Check if an investigation task already exists for this case
-        task_exists = False
-        for task in investigation_tasks:
-            summary = task.fields.summary
-            if testray_case_name in summary:
+    investigation_tasks = _load_investigation_tasks(jira_local)
+    tasks_by_case_name, untemplated_tasks = _index_investigation_tasks(investigation_tasks)
+
+    # Stream the results so large exports are never fully loaded in memory
+    with open(json_file_path, "rb") as file:
+        for test_result in ijson.items(file, "items.item"):
+            testray_case_name = test_result["testrayCaseName"]
+            testray_component_name = test_result["testrayComponentName"]
+            testray_case_type_name = test_result["testrayCaseTypeName"]
+            testray_run_name = test_result["testrayRunName"]
+            error = test_result["error"]
+            testray_case_result_id = test_result["testrayCaseResultId"]
+
+            # Check if an investigation task already exists for this case
+            existing_key = _find_investigation_task(testray_case_name, tasks_by_case_name, untemplated_tasks)
+            if existing_key:
                 print(
                     f"Testing task to investigate failure in {testray_case_name} "
-                    f"already exists with key {task.key}"
+                    f"already exists with key {existing_key}"
                 )
-                task_exists = True
-                break
-
-        if task_exists:
-            continue
-
-        # Create the summary and description for the new task
-        summary = f"[HL] Investigate failure in {testray_case_name}"
-        description = (
-            f"### Summary: [HL] Investigate failure in {testray_case_name}\n"
-            f"**Component**: {testray_component_name}\n\n"
-            f"**Test type**: {testray_case_type_name}\n"
-            f"**Environment**: {testray_run_name}\n"
-            f"**Error**: {error}\n\n"
-            f"**Testray link**: "
-            f"https://testray.liferay.com/#/project/35392/routines/994140/build/78629312/case-result/{testray_case_result_id}"
-        )
-        component = testray_component_name
-        environment = testray_run_name
-
-        # Create the new issue
-        new_issue = create_investigation_task_for(jira_local,summary,description,component,environment)
-        created_issues.append(new_issue)
-
-    return created_issues
+                continue
+            if testray_case_name in queued_case_names:
+                continue
+
+            # Create the summary and description for the new task
+            summary = INVESTIGATION_SUMMARY_PREFIX + testray_case_name
+            description = (
+                f"### Summary: {summary}\n"
+                f"**Component**: {testray_component_name}\n\n"
+                f"**Test type**: {testray_case_type_name}\n"
+                f"**Environment**: {testray_run_name}\n"
+                f"**Error**: {error}\n\n"
+                f"**Testray link**: "
+                f"https://testray.liferay.com/#/project/35392/routines/994140/build/78629312/case-result/{testray_case_result_id}"
+            )
+            component = testray_component_name
+            environment = testray_run_name
+
+            new_task_fields.append(get_investigation_task_fields(summary, description, component, environment))
+            queued_case_names.add(testray_case_name)
+
+    return create_investigation_tasks_for(jira_local, new_task_fields)
 
 def update_creation_subtask(jira):
     print("Updating test creation subtasks for Headless team...")
     stories_with_test_creation_subtask = \
-        jira.search_issues(Filter.Integration_In_Development_Sub_task_creation_Headless_team)
+        jira.search_issues(Filter.Integration_In_Development_Sub_task_creation_Headless_team, maxResults=False,
+                           fields=SUBTASK_UPDATE_FIELDS)
     for story in stories_with_test_creation_subtask:
         for subtask in story.fields.subtasks:
             summary = subtask.fields.summary
             key = subtask.key
-            assignee = jira.issue(key, fields='assignee')
             if summary == Strings.subtask_test_creation_summary:
                 print("Updating "+key+" ...")
                 if subtask.fields.status.name == Status.Open:
                     description = HeadlessStrings.test_creation_description
                     subtask.update(fields={'description': description})
-                    if assignee != 'Support QA':
-                        jira.assign_issue(subtask.id, 'support-qa')
+                    _assign_to_support_qa(jira, subtask)
                     break
     print("Subtasks Test Creation for Headless team are up to date")
 
 
 def update_validation_subtask(jira):
     print("Updating test validation subtasks for Headless team...")
-    stories_with_test_validation_subtask = jira.search_issues(Filter.Product_QA_Test_Validation_Round_1)
+    stories_with_test_validation_subtask = jira.search_issues(Filter.Product_QA_Test_Validation_Round_1,
+                                                              maxResults=False, fields=SUBTASK_UPDATE_FIELDS)
     for story in stories_with_test_validation_subtask:
         for subtask in story.fields.subtasks:
             summary = subtask.fields.summary
             key = subtask.key
-            assignee = jira.issue(key, fields='assignee')
             if 'Product QA | Test Validation' in summary:
                 if subtask.fields.status.name == Status.Open:
                     print("Updating "+key+" ...")
                     description = HeadlessStrings.test_validation_round_1_description
                     subtask.update(fields={'description': description})
-                    if assignee != 'Support QA':
-                        jira.assign_issue(subtask.id, 'support-qa')
+                    _assign_to_support_qa(jira, subtask)
                     break
     print("Validation subtasks for Headless team are up to date")
 
 
+def _extract_poshi_automation_table(description):
+    header = POSHI_TABLE_HEADER_RE.search(description)
+    if not header:
+        return ''
+    # A bold *Exploratory heading wins over a bare "Exploratory" that may appear inside the table
+    end = description.find('*Exploratory', header.start())
+    if end == -1:
+        end = description.find('Exploratory', header.start())
+    return description[header.start():end if end != -1 else None].rstrip()
+
+
+def _get_test_creation_descriptions(jira, stories):
+    """
+    Fetch the descriptions of every test creation subtask in one search instead of one GET per subtask.
+    Returns {subtask key: description}.
+    """
+    subtask_keys = [subtask.key for story in stories for subtask in story.get_field('subtasks')
+                    if subtask.fields.summary == Strings.subtask_test_creation_summary]
+    if not subtask_keys:
+        return {}
+    subtasks = jira.search_issues('key in (' + ','.join(subtask_keys) + ')', maxResults=False, fields='description')
+    return {subtask.key: subtask.fields.description for subtask in subtasks}
+
+
 def create_poshi_automation_task(jira):
     print("Creating Poshi tasks...")
     output_message = ''
     stories_without_poshi_automation_created = \
-        jira.search_issues(Filter.Headless_Team_Ready_to_create_POSHI_Automation_Task)
+        jira.search_issues(Filter.Headless_Team_Ready_to_create_POSHI_Automation_Task, maxResults=False,
+                           fields=POSHI_STORY_FIELDS)
+    descriptions = _get_test_creation_descriptions(jira, stories_without_poshi_automation_created)
     for story in stories_without_poshi_automation_created:
         for subtask in story.get_field('subtasks'):
             if subtask.fields.summary == Strings.subtask_test_creation_summary:
-                description = jira.issue(subtask.id, fields='description').fields.description
-                table_starring_string = ''
+                description = descriptions.get(subtask.key)
                 if description is not None:
-                    if description.find('||*Requirement*||') != -1:
-                        table_starring_string = '||*Requirement*||'
-                    elif description.find('||Requirement||') != -1:
-                        table_starring_string = '||Requirement||'
-                    table_staring_position = description.find(table_starring_string)
-                    table_ending_string = ''
-                    if description.find('*Exploratory') != -1:
-                        table_ending_string = '*Exploratory'
-                    elif description.find('Exploratory') != -1:
-                        table_ending_string = 'Exploratory'
-                    table_ending_position = description.find(table_ending_string)
-                    poshi_automation_table = description[table_staring_position:table_ending_position - 1]
+                    poshi_automation_table = _extract_poshi_automation_table(description)
                     poshi_task = _create_poshi_task_for(jira, story, poshi_automation_table)
                     if poshi_task:
                         close_functional_automation_subtask(jira, story, poshi_task.key)
@@ -17,7 +17,7 @@ from utils.liferay_utils.testray_utils.testray_helpers import (
     report_aft_ratio_for_latest,
 )
 from utils.liferay_utils.jira_utils.jira_liferay import get_jira_connection
-from utils.liferay_utils.testray_utils.testray_api import get_routine_to_builds
+from utils.liferay_utils.testray_utils.testray_api import get_routine_to_builds, get_task_subtasks
 
 
 def analyze_testflow(jira_connection, builds):
@@ -40,8 +40,10 @@ def analyze_testflow(jira_connection, builds):
     epic = find_testing_epic(jira_connection)
     maybe_autofill_from_previous(builds, latest_build)
 
+    subtasks = get_task_subtasks(task_id)
     batch_updates, subtasks_to_complete, subtask_to_issues = process_task_subtasks(
         task_id=task_id,
+        subtasks=subtasks,
         latest_build_id=latest_build_id,
         jira_connection=jira_connection,
         epic=epic,
@@ -49,6 +51,7 @@ def analyze_testflow(jira_connection, builds):
 
     finalize_task_completion(
         task_id=task_id,
+        subtasks=subtasks,
         latest_build_id=latest_build_id,
         jira_connection=jira_connection,
         subtasks_to_complete=subtasks_to_complete,
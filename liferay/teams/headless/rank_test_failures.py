@@ -1,51 +1,98 @@
 #!/usr/bin/env python3
 import sys
 import os
-from typing import Any, Dict, Set
+import re
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set
 
 # Ensure repo root is on path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from dateutil.parser import parse as parse_date
 
 from utils.liferay_utils.testray_utils.testray_api import (
     get_routine_to_builds,
     get_all_build_case_results,
-    get_all_cases_info_from_build,   # bulk case meta per build
     get_component_name,              # lazy resolve for top-N
-    fetch_case_results,              # case history (has PASSED + FAILED etc.)
-    HEADLESS_ROUTINE_ID,
+    TESTRAY_WORKERS,
 )
 
 # Non-passing statuses
-BAD_STATUSES = {"FAILED", "BLOCKED", "TESTFIX"}
+BAD_STATUSES = frozenset({"FAILED", "BLOCKED", "TESTFIX"})
 # Count these as "a run"
-RUN_STATUSES = BAD_STATUSES | {"PASSED"}  # ignore setup/skipped/etc.
+RUN_STATUSES = BAD_STATUSES | frozenset({"PASSED"})  # ignore setup/skipped/etc.
 
 # Months: May–Aug
 INCLUDED_MONTHS = {9,10}
 
+# Only the case result attributes read while ranking
+CASE_RESULT_FIELDS = ("dueStatus", "issues", "r_caseToCaseResult_c_caseId", "r_caseToCaseResult_c_case")
+
 # Skip any CASE whose name contains these substrings
 IGNORE_CASE_SUBSTRINGS = ("PortalLogAssertorTest-modules", "Top Level Build")
+IGNORE_CASE_RE = re.compile("|".join(map(re.escape, IGNORE_CASE_SUBSTRINGS)))
+
 
+@dataclass(slots=True)
+class CaseStats:
+    """Per-case counters collected across the analyzed builds."""
+    runs: int = 0
+    fails: int = 0
+    name: Optional[str] = None
+    component_id: Optional[int] = None
+    issues: Set[str] = field(default_factory=set)
 
-def _build_case_meta_for_build(build_id):
+
+def _compact_result(result):
     """
-    Bulk-load case metadata for a build:
-      { case_id -> {"name": str, "component_id": int or None} }
+    Reduce a case result (with its nested case) to the tuple pass 1 reads:
+    (case_id, case_name, component_id, status, issues), or None when it cannot be used.
     """
-    meta = {}
-    for item in get_all_cases_info_from_build(build_id):  # paginated internally
-        case = item.get("r_caseToCaseResult_c_case") or {}
-        case_id = case.get("id") or item.get("r_caseToCaseResult_c_caseId")
-        if not case_id:
-            continue
-        meta[case_id] = {
-            "name": case.get("name", f"Case {case_id}"),
-            "component_id": case.get("r_componentToCases_c_componentId"),
-        }
-    return meta
+    case = result.get("r_caseToCaseResult_c_case")
+    if not case:
+        return None
+
+    case_id = case.get("id") or result.get("r_caseToCaseResult_c_caseId")
+    if not case_id:
+        return None
+
+    status_obj = result.get("dueStatus")
+    status = status_obj.get("key") if isinstance(status_obj, dict) else status_obj
+    if not status:
+        return None
+
+    return (
+        case_id,
+        case.get("name") or f"Case {case_id}",
+        case.get("r_componentToCases_c_componentId"),
+        status,
+        result.get("issues"),
+    )
+
+
+def _fetch_build(build_id):
+    """
+    Fetch the case results of one build as compact tuples; all builds are held at once
+    while the pool drains, so the nested result dicts are not kept around.
+    """
+    rows = []
+    for result in get_all_build_case_results(build_id, include_case_meta=True, fields=CASE_RESULT_FIELDS):
+        row = _compact_result(result)
+        if row:
+            rows.append(row)
+    return rows
+
+
+def _parse_due_date(due_str):
+    """Parse Testray's ISO 8601 dueDate; dateutil is only the fallback for anything else."""
+    try:
+        return datetime.fromisoformat(due_str)
+    except ValueError:
+        return parse_date(due_str)
 
 
 def _in_range(d, start_d, end_d):
@@ -54,7 +101,7 @@ def _in_range(d, start_d, end_d):
 
 
 
-def collect_case_failures_for_year(year: int = 2025) -> Dict[int, Dict[str, Any]]:
+def collect_case_failures_for_year(year: int = 2025) -> Dict[int, CaseStats]:
     """
     Count FAILS per test case across Headless builds in selected months of {year}.
     Assume every test runs in each analyzed build, so RUNS = number of builds.
@@ -62,27 +109,22 @@ def collect_case_failures_for_year(year: int = 2025) -> Dict[int, Dict[str, Any]
     """
     print(f"📊 Collecting HEADLESS test case results for {year} (months {sorted(INCLUDED_MONTHS)})...")
 
-    builds = get_routine_to_builds()  # already Headless only
-    case_stats: Dict[int, Dict[str, Any]] = defaultdict(lambda: {
-        "runs": 0,
-        "fails": 0,
-        "name": None,
-        "component_id": None,
-        "issues": set(),      # type: Set[str]
-        "issues_str": "",     # flattened string for printing
-    })
+    # Only request builds due within the span of the included months; the loop below still filters exactly
+    first_month, last_month = min(INCLUDED_MONTHS), max(INCLUDED_MONTHS)
+    dt_from = f"{year}-{first_month:02d}-01T00:00:00Z"
+    dt_to = f"{year + 1}-01-01T00:00:00Z" if last_month == 12 else f"{year}-{last_month + 1:02d}-01T00:00:00Z"
+    builds = get_routine_to_builds(dt_from=dt_from, dt_to=dt_to)  # already Headless only
+    case_stats: Dict[int, CaseStats] = defaultdict(CaseStats)
 
     analyzed_builds: list[int] = []
 
-    # --- Pass 1: gather failures, metadata, and issues ---
+    # only keep builds in correct year + included months
     for build in builds:
         due_str = build.get("dueDate")
         if not due_str:
             continue
 
-        dt = parse_date(due_str)
-
-        # only keep builds in correct year + included months
+        dt = _parse_due_date(due_str)
         if dt.year != year or dt.month not in INCLUDED_MONTHS:
             continue
 
@@ -93,92 +135,90 @@ def collect_case_failures_for_year(year: int = 2025) -> Dict[int, Dict[str, Any]
         analyzed_builds.append(build_id)
         print(f"🔍 Processing build {build.get('name', '')} ({build_id})")
 
-        # Bulk metadata for this build
-        case_meta = _build_case_meta_for_build(build_id)
+    # --- Pass 1: gather failures, metadata, and issues ---
+    # Builds are fetched concurrently; aggregation stays on this thread, in build order
+    with ThreadPoolExecutor(max_workers=TESTRAY_WORKERS) as executor:
+        fetched_builds = executor.map(_fetch_build, analyzed_builds)
 
+    for build_rows in fetched_builds:
         # Get all case results (usually only failing ones)
-        for result in get_all_build_case_results(build_id):
-            case_id = result.get("r_caseToCaseResult_c_caseId")
-            if not case_id:
-                continue
-
-            meta = case_meta.get(case_id)
-            if not meta:
-                continue
-
-            case_name = meta["name"] or f"Case {case_id}"
-            if any(sub in case_name for sub in IGNORE_CASE_SUBSTRINGS):
-                continue
-
-            status_obj = result.get("dueStatus")
-            status = status_obj.get("key") if isinstance(status_obj, dict) else status_obj
-            if not status:
+        for case_id, case_name, component_id, status, issues_str in build_rows:
+            # Cases already in case_stats passed the ignore check in an earlier build
+            if case_id not in case_stats and IGNORE_CASE_RE.search(case_name):
                 continue
 
             stats = case_stats[case_id]
-            if stats["name"] is None:
-                stats["name"] = case_name
-                stats["component_id"] = meta["component_id"]
+            if stats.name is None:
+                stats.name = case_name
+                stats.component_id = component_id
 
             # Track fails
             if status in BAD_STATUSES:
-                stats["fails"] += 1
+                stats.fails += 1
 
             # --- Track issues safely ---
-            issues_str = result.get("issues")
             if issues_str:
                 for issue in issues_str.split(","):
                     issue = issue.strip()
                     if issue:
-                        stats["issues"].add(issue)
+                        stats.issues.add(issue)
 
-    # --- Pass 2: normalize runs and flatten issues ---
+    # --- Pass 2: normalize runs (issues are joined later, only for the ranked rows) ---
     total_runs = len(analyzed_builds)
     print(f"📈 Normalizing RUNS to {total_runs} builds for every case")
 
     for stats in case_stats.values():
-        stats["runs"] = total_runs
-        if isinstance(stats.get("issues"), set):
-            # Put the stringified version in a separate field
-            stats["issues_str"] = ", ".join(sorted(stats["issues"]))
+        stats.runs = total_runs
 
     return case_stats
 
+def _fail_ratio(stats):
+    return stats.fails / stats.runs if stats.runs else 0.0
+
+
+def _rank_key(item):
+    """Sort key for (case_id, stats): fail ratio, then fails, then runs, all descending."""
+    stats = item[1]
+    fails, runs = stats.fails, stats.runs
+    return -(fails / runs), -fails, -runs
+
+
 def rank_worst_cases(case_stats, top_n=50, min_runs=3):
     """Rank by highest fail ratio; break ties by fails then runs; ignore low-sample cases."""
-    ranked = []
-    for case_id, stats in case_stats.items():
-        runs = stats["runs"]
-        fails = stats["fails"]
-        if runs < min_runs:
-            continue
-        fail_ratio = fails / runs if runs else 0.0
-        ranked.append({
+    # min_runs >= 1 keeps runs > 0 in _rank_key
+    min_runs = max(min_runs, 1)
+    eligible = ((case_id, stats) for case_id, stats in case_stats.items() if stats.runs >= min_runs)
+    # Partial sort: only the top_n rows are ordered and turned into result dicts
+    top = heapq.nsmallest(top_n, eligible, key=_rank_key)
+    return [
+        {
             "case_id": case_id,
-            "name": stats["name"],
-            "component_id": stats["component_id"],
-            "runs": runs,
-            "fails": fails,
-            "fail_ratio": fail_ratio,
-            "issues": stats.get("issues_str", ""),
-        })
-    ranked.sort(key=lambda x: (-x["fail_ratio"], -x["fails"], -x["runs"]))
-    return ranked[:top_n]
+            "name": stats.name,
+            "component_id": stats.component_id,
+            "runs": stats.runs,
+            "fails": stats.fails,
+            "fail_ratio": _fail_ratio(stats),
+            "issues": ", ".join(sorted(stats.issues)),
+        }
+        for case_id, stats in top
+    ]
+
+
+def _component_name_or_id(cid):
+    try:
+        return get_component_name(cid)
+    except Exception:
+        return f"Component {cid}"
 
 
 def print_ranking(ranked_cases):
-    # Lazily resolve component names only for the top results
-    component_cache = {}
+    # Resolve component names only for the top results, concurrently
+    component_ids = list(dict.fromkeys(case["component_id"] for case in ranked_cases if case["component_id"]))
+    with ThreadPoolExecutor(max_workers=TESTRAY_WORKERS) as executor:
+        component_cache = dict(zip(component_ids, executor.map(_component_name_or_id, component_ids)))
 
     def comp_name(cid):
-        if not cid:
-            return "Unknown"
-        if cid not in component_cache:
-            try:
-                component_cache[cid] = get_component_name(cid)
-            except Exception:
-                component_cache[cid] = f"Component {cid}"
-        return component_cache[cid]
+        return component_cache[cid] if cid else "Unknown"
 
     print("\n--- Worst Failing Tests Ranking ---\n")
     header = f"{'Case ID':<10} {'Fails':<6} {'Runs':<6} {'Fail %':<8} {'Component':<30} {'Issues':<25} Name"
@@ -8,6 +8,7 @@ from jira import JIRA
 # Ensure repo root is on the path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..')))
+from utils.liferay_utils.jira_utils.jira_helpers import get_issues_by_keys
 from utils.liferay_utils.jira_utils.jira_liferay import get_jira_connection
 
 # ✅ Paste your ordered list of open issues here
@@ -45,25 +46,25 @@ OPEN_ISSUES = [
 def get_issue_details(jira_connection: JIRA, issue_keys: List[str]):
     """
     Fetch summary and components for each Jira issue key, preserving order.
+    The keys are fetched with chunked JQL searches instead of one request per issue.
     """
     results = []
+    issues_by_key = get_issues_by_keys(jira_connection, issue_keys, fields="summary,components")
 
     for issue_key in issue_keys:
-        try:
-            issue = jira_connection.issue(issue_key)
+        issue = issues_by_key.get(issue_key)
+        if issue is None:
+            continue
 
-            summary = issue.fields.summary
-            components = [c.name for c in issue.fields.components] or ["(No components)"]
-            link = f"https://liferay.atlassian.net/browse/{issue_key}"
+        summary = issue.fields.summary
+        components = [c.name for c in issue.fields.components] or ["(No components)"]
+        link = f"https://liferay.atlassian.net/browse/{issue_key}"
 
-            results.append({
-                "link": link,
-                "summary": summary,
-                "components": ", ".join(components),
-            })
-
-        except Exception as e:
-            print(f"⚠️ Error retrieving {issue_key}: {e}")
+        results.append({
+            "link": link,
+            "summary": summary,
+            "components": ", ".join(components),
+        })
 
     return results
 
@@ -8,6 +8,7 @@ from jira import JIRA
 # Ensure repo root is on the path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..')))
+from utils.liferay_utils.jira_utils.jira_helpers import get_issue_statuses_by_keys
 from utils.liferay_utils.jira_utils.jira_liferay import get_jira_connection
 
 def find_lines_with_open_issues(jira_connection: JIRA, jira_lines: List[str]) -> List[Tuple[str, List[str]]]:
@@ -16,24 +17,29 @@ def find_lines_with_open_issues(jira_connection: JIRA, jira_lines: List[str]) ->
     Return tuples: (original line, list of open issue keys).
     """
     results = []
+    # Repeated lines are parsed once and their keys queried once
+    keys_by_line = {
+        line: [key.strip() for key in line.split(",") if key.strip()]
+        for line in dict.fromkeys(jira_lines)
+    }
+    unique_keys = list(dict.fromkeys(key for issue_keys in keys_by_line.values() for key in issue_keys))
+    if not unique_keys:
+        return results
 
-    for line in jira_lines:
-        issue_keys = [key.strip() for key in line.split(",") if key.strip()]
-        if not issue_keys:
-            continue
-
-        open_issues = []
+    # Bulk lookup that falls back per key, so one unknown key cannot empty the whole report
+    open_keys = {
+        issue_key
+        for issue_key, status_name in get_issue_statuses_by_keys(jira_connection, unique_keys).items()
+        if status_name and status_name.strip().lower() == "open"
+    }
 
-        for issue_key in issue_keys:
-            try:
-                issue = jira_connection.issue(issue_key)
-                status_name = issue.fields.status.name.strip().lower()
+    open_issues_by_line = {
+        line: [issue_key for issue_key in issue_keys if issue_key in open_keys]
+        for line, issue_keys in keys_by_line.items()
+    }
 
-                if status_name == "open":
-                    open_issues.append(issue_key)
-
-            except Exception as e:
-                print(f"⚠️ Error retrieving {issue_key}: {e}")
+    for line in jira_lines:
+        open_issues = open_issues_by_line[line]
 
         if open_issues:
             results.append((line, open_issues))
@@ -29,14 +29,14 @@ def main():
     file_name = user_id + '_filters.pkl'
     with open(file_name, 'rb') as inp:
         filters_to_import = pickle.load(inp)
-    existing_filters = jira_connection.favourite_filters()
+    existing_filter_names = {obj.name for obj in jira_connection.favourite_filters()}
     error = 0
     imported = 0
     skipped = 0
     filters_to_import.sort(key=lambda x: x.id, reverse=False)
 
     for filter_to_import in filters_to_import:
-        if any(obj.name == filter_to_import.name for obj in existing_filters):
+        if filter_to_import.name in existing_filter_names:
             logging.info('[SKIPPING] Filter "' + filter_to_import.name + '" exists in destination. Skipping')
             skipped += 1
         else:
@@ -10,6 +10,10 @@ AUTOMATION_TABLE_HEADER = '||Test Scenarios||Test Strategy||Kind of test||Is it
                           'POSHI?||'
 LIFERAY_JIRA_BROWSE_URL = Instance.Jira_URL + "/browse/"
 LIFERAY_JIRA_ISSUES_URL = Instance.Jira_URL + "/issues/"
+# Jira accepts at most 50 issues per bulk create request
+BULK_CREATE_LIMIT = 50
+# Issue keys per bulk 'key in (...)' search; keeps the JQL short enough for a GET
+ISSUE_SEARCH_CHUNK = 100
 
 
 def __initialize_subtask(story, components, summary, issuetype, description=''):
@@ -161,8 +165,8 @@ def close_functional_automation_subtask(jira_local, story, poshi_task=''):
                     jira_local.add_comment(testing_subtask, 'Closing. Poshi automation not needed')
             break
 
-def create_investigation_task_for(jira_local, summary, description, component, environment):
-    issue_dict = {
+def get_investigation_task_fields(summary, description, component, environment):
+    return {
         'project': {'key': 'LPD'},
         "summary": summary,
         "description": description,
@@ -171,10 +175,32 @@ def create_investigation_task_for(jira_local, summary, description, component, e
         "labels" : ["hl_routine_tasks"],
         "customfield_environment": environment,
     }
+
+def create_investigation_task_for(jira_local, summary, description, component, environment):
+    issue_dict = get_investigation_task_fields(summary, description, component, environment)
     new_issue = jira_local.create_issue(fields=issue_dict)
     print(f"Created new investigation task: {new_issue.key}")
     return new_issue
 
+def create_investigation_tasks_for(jira_local, field_list):
+    """
+    Create investigation tasks through the bulk create endpoint, BULK_CREATE_LIMIT issues per request.
+
+    :param field_list: Issue fields as built by get_investigation_task_fields.
+    :return: List of created Jira issues; failures are printed and skipped.
+    """
+    created_issues = []
+    for start in range(0, len(field_list), BULK_CREATE_LIMIT):
+        # prefetch=False: the bulk response already carries the keys, skip one GET per created issue
+        chunk = field_list[start:start + BULK_CREATE_LIMIT]
+        for result in jira_local.create_issues(field_list=chunk, prefetch=False):
+            if result['status'] == 'Success':
+                print(f"Created new investigation task: {result['issue'].key}")
+                created_issues.append(result['issue'])
+            else:
+                print(f"✘ Could not create investigation task {result['input_fields']['summary']}: {result['error']}")
+    return created_issues
+
 def create_jira_task(
         jira_local,
         epic,
@@ -315,6 +341,51 @@ def get_issue_status_by_key(jira_local, issue_key):
         print(f"Error retrieving issue {issue_key}: {str(e)}")
         return None, None
 
+def get_issues_by_keys(jira_local, issue_keys, fields):
+    """
+    Retrieves many issues with one 'key in (...)' search per chunk. Keys the search does not
+    return (moved issues come back under their new key, failed searches) are read one by one.
+
+    :param jira_local: Authenticated Jira connection.
+    :param issue_keys: Iterable of issue keys.
+    :param fields: Comma-separated fields to retrieve.
+    :return: Dict {issue_key: issue} for the requested keys; keys that could not be read are left out.
+    """
+    keys = list(dict.fromkeys(issue_keys))
+    issues_by_key = {}
+    for start in range(0, len(keys), ISSUE_SEARCH_CHUNK):
+        chunk = keys[start:start + ISSUE_SEARCH_CHUNK]
+        # validate_query=False: unknown or hidden keys are dropped instead of failing the search
+        try:
+            issues = jira_local.search_issues(
+                f"key in ({', '.join(chunk)})", fields=fields, maxResults=False, validate_query=False
+            )
+            issues_by_key.update({issue.key: issue for issue in issues})
+        except Exception as e:
+            print(f"Error retrieving {len(chunk)} issues: {str(e)}")
+
+    for issue_key in keys:
+        if issue_key not in issues_by_key:
+            try:
+                issues_by_key[issue_key] = jira_local.issue(issue_key, fields=fields)
+            except Exception as e:
+                print(f"Error retrieving issue {issue_key}: {str(e)}")
+    return {issue_key: issues_by_key[issue_key] for issue_key in keys if issue_key in issues_by_key}
+
+def get_issue_statuses_by_keys(jira_local, issue_keys):
+    """
+    Retrieves the status names of many issues with get_issues_by_keys.
+
+    :param jira_local: Authenticated Jira connection.
+    :param issue_keys: Iterable of issue keys.
+    :return: Dict {issue_key: status_name}; status_name is None if the issue could not be read.
+    """
+    issues = get_issues_by_keys(jira_local, issue_keys, fields="status")
+    return {
+        issue_key: issues[issue_key].fields.status.name if issue_key in issues else None
+        for issue_key in dict.fromkeys(issue_keys)
+    }
+
 def create_poshi_automation_task_for_bug(jira_local, bug):
     parent_key = bug.key
     bug_summary = bug.fields.summary
@@ -518,12 +589,14 @@ def set_filter_permissions(jira_connection, jira_url, new_filter, permissions, e
     url = jira_url + "/rest/api/2/filter/" + filter_id
 
     credentials = get_credentials()
-    auth = HTTPBasicAuth(credentials[0], credentials[1])
 
-    headers = {
+    # One keep-alive session for all the permission updates of this filter
+    session = requests.Session()
+    session.auth = HTTPBasicAuth(credentials[0], credentials[1])
+    session.headers.update({
         "Accept": "application/json",
         "Content-Type": "application/json"
-    }
+    })
     for permission in permissions:
         current_filter = jira_connection.filter(filter_id)
         edit_permissions = _parse_permission(current_filter.editPermissions)
@@ -578,15 +651,10 @@ def set_filter_permissions(jira_connection, jira_url, new_filter, permissions, e
             "name": new_filter.name,
             "sharePermissions": share_permissions
         })
-        response = requests.request(
-            "PUT",
-            url,
-            data=payload,
-            headers=headers,
-            auth=auth
-        )
+        response = session.put(url, data=payload)
 
         if not response.ok:
             error_message += '  Permission no created: ' + response.text
 
+    session.close()
     return error_message
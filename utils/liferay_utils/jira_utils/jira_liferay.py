@@ -1,8 +1,24 @@
+import time
+
 from jira import JIRA
 
 from utils.liferay_utils.jira_utils.jira_constants import Instance
 from utils.liferay_utils.manageCredentialsCrypto import get_credentials
 
+RATE_LIMIT_DEFAULT_PAUSE_SECONDS = 1
+
+
+def _pace_on_rate_limit(response, *args, **kwargs):
+    """
+    Response hook: when Jira reports the rate limit budget is nearly spent, wait the announced
+    Retry-After (or a short default) before the next call instead of running into 429s.
+    The client already retries the 429s themselves, honouring Retry-After.
+    """
+    if response.headers.get('X-RateLimit-NearLimit', '').lower() == 'true':
+        retry_after = response.headers.get('Retry-After', '')
+        time.sleep(int(retry_after) if retry_after.isdigit() else RATE_LIMIT_DEFAULT_PAUSE_SECONDS)
+    return response
+
 
 def get_jira_connection(instance_url=Instance.Jira_URL, instance_type=Instance.Type):
     print("Getting credentials")
@@ -16,6 +32,7 @@ def get_jira_connection(instance_url=Instance.Jira_URL, instance_type=Instance.T
             jira = JIRA(instance_url, token_auth=login[1])
         else:
             raise Exception("Sorry, only Cloud and Server are valid values for Instance.Type")
+        jira._session.hooks['response'].append(_pace_on_rate_limit)
         print("Connected to Jira")
     except Exception as err:
         raise Exception("Error accessing Jira instance. Please check .jira_user folder and jira_constants.py: "
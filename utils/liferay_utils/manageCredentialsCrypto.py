@@ -2,19 +2,25 @@
 from os import remove
 from pathlib import Path
 from Crypto.PublicKey import RSA
-from Crypto.Cipher import PKCS1_OAEP
+from Crypto.Cipher import AES, PKCS1_OAEP
 from os.path import expanduser
 from shutil import rmtree
 import os
 import sys
 
 FOLDER_NAME = ".jira_user"
+# AES-256-GCM: token file layout is nonce + ciphertext + tag
+KEY_SIZE = 32
+NONCE_SIZE = 12
+TAG_SIZE = 16
 
 def delete_credentials():
     home = Path.home()
     folder = home / FOLDER_NAME
 
     files_to_delete = [
+        folder / "token.gcm",
+        folder / "key.bin",
         folder / "token.enc",
         folder / "public.pem",
         folder / "private.pem"
@@ -30,50 +36,76 @@ def encrypt_and_store_token():
     home = Path(expanduser("~"))
     folder = home / FOLDER_NAME
     path_to_token_plain = folder / "token"
-    path_to_token_enc = folder / "token.enc"
-    pub_key_path = folder / "public.pem"
-
-    # Make sure RSA keys exist
-    generate_rsa_keypair(folder)
+    path_to_token_gcm = folder / "token.gcm"
 
     if not path_to_token_plain.is_file():
         print("No plaintext token to encrypt.")
         return
 
-    with open(pub_key_path, "rb") as f:
-        public_key = RSA.import_key(f.read())
-
     with open(path_to_token_plain, "r") as f:
         token = f.read().strip()
 
-    cipher = PKCS1_OAEP.new(public_key)
-    encrypted_token = cipher.encrypt(token.encode())
-
-    with open(path_to_token_enc, "wb") as f:
-        f.write(encrypted_token)
+    store_encrypted_token(folder, token)
 
     remove(path_to_token_plain)
-    print(f"Encrypted token saved to {path_to_token_enc} and plaintext token removed.")
+    print(f"Encrypted token saved to {path_to_token_gcm} and plaintext token removed.")
 
-def generate_rsa_keypair(folder: Path):
-    private_key_path = folder / "private.pem"
-    public_key_path = folder / "public.pem"
+def _write_private_file(path: Path, data: bytes):
+    """Write data to a file that is owner-only (0600) from the moment it is created."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        os.fchmod(f.fileno(), 0o600)  # also tightens a file left by an older version
+        f.write(data)
 
-    if private_key_path.exists() and public_key_path.exists():
-        return  # Already exists
+def generate_aes_key(folder: Path):
+    key_path = folder / "key.bin"
 
-    key = RSA.generate(2048)
-    private_key = key.export_key()
-    public_key = key.publickey().export_key()
+    if key_path.exists():
+        return  # Already exists
 
     folder.mkdir(parents=True, exist_ok=True)
+    _write_private_file(key_path, os.urandom(KEY_SIZE))
+
+    print(f"AES key generated in {folder}")
+
+def encrypt_with_key(folder: Path, data: bytes) -> bytes:
+    """Encrypt data with the AES key in folder (created if missing); returns nonce + ciphertext + tag."""
+    # Make sure the AES key exists
+    generate_aes_key(folder)
+
+    key = (folder / "key.bin").read_bytes()
+    nonce = os.urandom(NONCE_SIZE)
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    encrypted_data, tag = cipher.encrypt_and_digest(data)
+
+    return nonce + encrypted_data + tag
+
+def decrypt_with_key(folder: Path, data: bytes) -> bytes:
+    """Reverse encrypt_with_key; raises ValueError if the data was tampered with or another key was used."""
+    key = (folder / "key.bin").read_bytes()
+
+    nonce, encrypted_data, tag = data[:NONCE_SIZE], data[NONCE_SIZE:-TAG_SIZE], data[-TAG_SIZE:]
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+
+    return cipher.decrypt_and_verify(encrypted_data, tag)
+
+def store_encrypted_token(folder: Path, token: str):
+    _write_private_file(folder / "token.gcm", encrypt_with_key(folder, token.encode()))
 
-    with open(private_key_path, "wb") as f:
-        f.write(private_key)
-    with open(public_key_path, "wb") as f:
-        f.write(public_key)
+def decrypt_token(folder: Path):
+    return decrypt_with_key(folder, (folder / "token.gcm").read_bytes()).decode()
 
-    print(f"RSA key pair generated in {folder}")
+def decrypt_legacy_rsa_token(folder: Path):
+    """Read a token stored by the previous RSA-OAEP scheme (private.pem + token.enc)."""
+    with open(folder / "private.pem", "rb") as f:
+        private_key = RSA.import_key(f.read())
+
+    cipher = PKCS1_OAEP.new(private_key)
+
+    with open(folder / "token.enc", 'rb') as f:
+        encrypted_token = f.read()
+
+    return cipher.decrypt(encrypted_token).decode()
 
 def get_credentials():
     """
@@ -93,6 +125,8 @@ def get_credentials():
     folder = home / FOLDER_NAME
     path_to_user = folder / "user"
     path_to_token_plain = folder / "token"
+    path_to_token_gcm = folder / "token.gcm"
+    path_to_key = folder / "key.bin"
     path_to_token_enc = folder / "token.enc"
     priv_key_path = folder / "private.pem"
 
@@ -100,23 +134,22 @@ def get_credentials():
     if path_to_token_plain.is_file():
         encrypt_and_store_token()
 
-    # Now validate required credential files
-    if not (path_to_user.is_file() and priv_key_path.is_file() and path_to_token_enc.is_file()):
+    if not path_to_user.is_file():
         print(f"Missing required credential files in {folder}.")
         sys.exit(1)
 
     with open(path_to_user, 'r') as f:
         username = f.read().strip()
 
-    with open(priv_key_path, "rb") as f:
-        private_key = RSA.import_key(f.read())
-
-    cipher = PKCS1_OAEP.new(private_key)
-
-    with open(path_to_token_enc, 'rb') as f:
-        encrypted_token = f.read()
-
-    token = cipher.decrypt(encrypted_token).decode()
+    if path_to_key.is_file() and path_to_token_gcm.is_file():
+        token = decrypt_token(folder)
+    elif priv_key_path.is_file() and path_to_token_enc.is_file():
+        # Migrate credentials stored with RSA; the old files are kept until deleted
+        token = decrypt_legacy_rsa_token(folder)
+        store_encrypted_token(folder, token)
+    else:
+        print(f"Missing required credential files in {folder}.")
+        sys.exit(1)
 
     return username, token
 
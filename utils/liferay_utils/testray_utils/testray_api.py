@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
 
-import base64
+import atexit
+import ijson
+import orjson
 import requests
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from dotenv import load_dotenv
-from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from functools import lru_cache, wraps
+from utils.liferay_utils.manageCredentialsCrypto import FOLDER_NAME, decrypt_with_key, encrypt_with_key
 
 import os
+import time
 from pathlib import Path
 
 # ------------------------ AUTH CONFIG ------------------------
@@ -31,35 +39,196 @@ CSRF_TOKEN = os.getenv("CSRF_TOKEN")
 
 BASE_URL = "https://testray.liferay.com/o/c"
 TESTRAY_REST_URL = "https://testray.liferay.com/o/testray-rest/v1.0"
+IMPORT_TASK_URL = "https://testray.liferay.com/o/headless-batch-engine/v1.0/import-task"
 HEADLESS_ROUTINE_ID = 994140
 EE_PULL_REQUEST_ROUTINE_ID = 45357
 
+# Connections the Testray session keeps open; every thread pool issuing Testray calls is sized against it
+TESTRAY_POOL_MAXSIZE = 32
+# Concurrent Testray calls per thread pool. Pools nest at most two deep (a fetch pool whose tasks
+# page through iter_all_pages), so TESTRAY_WORKERS ** 2 in-flight calls stay within the pool.
+TESTRAY_WORKERS = 5
+
+# ============================ HTTP SESSION ============================
+
+# One pooled keep-alive session for every Testray call instead of a new connection (and TLS handshake) per request.
+# pool_block makes concurrent callers wait for a free connection instead of opening throwaway sockets past pool_maxsize.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=TESTRAY_POOL_MAXSIZE,
+    pool_block=True,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False),
+))
+
+
+def _read_cached_token():
+    """Return (token, expires_at) cached by a previous run, if it is still valid."""
+    try:
+        cached = orjson.loads(decrypt_with_key(TOKEN_KEY_FOLDER, TOKEN_CACHE_FILE.read_bytes()))
+    except (OSError, ValueError):
+        # Also a cache written with another key, tampered with or not JSON (JSONDecodeError is a ValueError)
+        return None
+    if not isinstance(cached, dict) or not cached.get("access_token"):
+        return None
+    if cached.get("expires_at", 0) - TOKEN_EXPIRY_MARGIN_SECONDS > time.time():
+        return cached["access_token"], cached["expires_at"]
+    return None
+
 
-def get_access_token():
-    response = requests.post(
+def _write_cached_token(access_token, expires_at):
+    """
+    Cache the token with its expiry, encrypted with the local credentials key; written to a temp
+    file and renamed so readers never see half a file.
+    """
+    try:
+        TOKEN_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        data = encrypt_with_key(TOKEN_KEY_FOLDER, orjson.dumps({"access_token": access_token, "expires_at": expires_at}))
+        tmp_file = TOKEN_CACHE_FILE.with_suffix(".tmp")
+        # Owner-only from the moment it exists; fchmod covers a leftover temp file from older runs
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(f.fileno(), 0o600)
+            f.write(data)
+        os.replace(tmp_file, TOKEN_CACHE_FILE)
+        # Plaintext cache of older versions
+        LEGACY_TOKEN_CACHE_FILE.unlink(missing_ok=True)
+    except OSError as e:
+        print(f"⚠️ Could not cache Testray token: {e}")
+
+
+def fetch_access_token():
+    """Request a new token; returns (token, expires_at). Without expires_in it is used until a 401."""
+    response = SESSION.post(
         TOKEN_URL,
-        headers={
-            "Authorization": f"Basic {base64.b64encode(f'{CLIENT_ID}:{CLIENT_SECRET}'.encode()).decode()}",
-            "Content-Type": "application/x-www-form-urlencoded"
-        },
+        auth=(CLIENT_ID, CLIENT_SECRET),
         data={"grant_type": "client_credentials"},
     )
     response.raise_for_status()
-    return response.json()["access_token"]
+    body = orjson.loads(response.content)
+
+    expires_in = body.get("expires_in")
+    if not expires_in:
+        return body["access_token"], float("inf")
+
+    expires_at = time.time() + expires_in
+    _write_cached_token(body["access_token"], expires_at)
+    return body["access_token"], expires_at
+
+
+def _token_is_fresh():
+    return ACCESS_TOKEN is not None and time.time() < ACCESS_TOKEN_EXPIRES_AT - TOKEN_EXPIRY_MARGIN_SECONDS
+
+
+def get_access_token(rejected_token=None):
+    """
+    Return the Testray token: in memory while not close to expiry, then the on-disk cache,
+    then a new OAuth request. Refreshes happen under a lock, so concurrent callers share one.
+    rejected_token (one the server answered 401 to) forces a new token, unless another
+    thread already replaced it.
+    """
+    global ACCESS_TOKEN, ACCESS_TOKEN_EXPIRES_AT
+
+    if rejected_token is None and _token_is_fresh():
+        return ACCESS_TOKEN
+
+    with TOKEN_LOCK:
+        if rejected_token is None:
+            if _token_is_fresh():
+                return ACCESS_TOKEN
+            cached = _read_cached_token()
+        else:
+            if ACCESS_TOKEN != rejected_token:
+                return ACCESS_TOKEN
+            cached = None
+        ACCESS_TOKEN, ACCESS_TOKEN_EXPIRES_AT = cached or fetch_access_token()
+    return ACCESS_TOKEN
+
+
+class BearerTokenAuth(requests.auth.AuthBase):
+    """
+    Attach the Testray token to each request of every verb; it is only obtained on the first
+    call, not at import, and refreshed ahead of expiry. A 401 refreshes it and resends once.
+    """
+
+    def __call__(self, request):
+        request.headers["Authorization"] = f"Bearer {get_access_token()}"
+        request.register_hook("response", self.handle_401)
+        return request
+
+    def handle_401(self, response, **kwargs):
+        if response.status_code != 401 or getattr(response.request, "token_retried", False):
+            return response
+
+        # Release the connection before resending
+        response.content
+        response.close()
 
+        rejected_token = response.request.headers["Authorization"].removeprefix("Bearer ")
+        retry = response.request.copy()
+        retry.token_retried = True
+        retry.headers["Authorization"] = f"Bearer {get_access_token(rejected_token=rejected_token)}"
 
-ACCESS_TOKEN = get_access_token()
+        retried_response = response.connection.send(retry, **kwargs)
+        retried_response.history.append(response)
+        retried_response.request = retry
+        return retried_response
+
+
+ACCESS_TOKEN = None
+ACCESS_TOKEN_EXPIRES_AT = 0
+TOKEN_LOCK = threading.Lock()
 
 HEADERS = {
-    "Authorization": f"Bearer {ACCESS_TOKEN}",
     "Accept": "application/json"
 }
+# Default headers and auth for every session call; requests that need more pass only the extras
+SESSION.headers.update(HEADERS)
+SESSION.auth = BearerTokenAuth()
+# Extra headers for JSON writes, merged by the session on top of its defaults
+HEADERS_JSON = {
+    "Content-Type": "application/json"
+}
 
 HEADERS2 = {
     "Cookie": f"JSESSIONID={SESSION_ID}",
     "x-csrf-token": CSRF_TOKEN,
     "Accept": "application/json"
 }
+# OAuth token reused across runs until shortly before it expires, encrypted with the AES key
+# that manageCredentialsCrypto keeps for the Jira token
+TOKEN_CACHE_FILE = Path.home() / ".cache" / "testray_token.gcm"
+LEGACY_TOKEN_CACHE_FILE = Path.home() / ".cache" / "testray_token.json"
+TOKEN_KEY_FOLDER = Path.home() / FOLDER_NAME
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
+
+# Component names are kept between runs; the file is rebuilt once a week so renamed components
+# refresh, and whenever COMPONENT_CACHE_VERSION (its layout) changes
+COMPONENT_CACHE_FILE = Path.home() / ".cache" / "testray_components.json"
+COMPONENT_CACHE_VERSION = 1
+COMPONENT_CACHE_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+# In-process cache bounds, sized to a run's working set
+BUILD_CACHE_SIZE = 1024
+CASE_CACHE_SIZE = 16384
+CASE_TYPE_CACHE_SIZE = 256
+COMPONENT_CACHE_SIZE = 2048
+
+# Cases loaded in bulk by prefetch_cases_info, consumed by get_case_info
+PREFETCHED_CASES = {}
+CASE_BULK_SIZE = 50
+
+# url -> (ETag, payload) of the last response, for conditional GETs of mutable resources
+ETAG_STORE = {}
+
+# Case results per batch endpoint request
+BATCH_MAX_ITEMS = 1000
+# Cleared on the first 404 from the batch endpoint, so later batches go straight to per-item PUTs
+BATCH_ENDPOINT_AVAILABLE = True
+# How often and how long to poll the import task of a batch request
+IMPORT_TASK_POLL_SECONDS = 2
+IMPORT_TASK_TIMEOUT_SECONDS = 600
+
 # Status filters
 STATUS_FAILED_BLOCKED_TESTFIX = "FAILED,TESTFIX,BLOCKED"
 STATUS_FAILED_PASSED = "FAILED,PASSED"
@@ -68,52 +237,251 @@ STATUS_FAILED_PASSED = "FAILED,PASSED"
 # ============================ HTTP HELPERS ============================
 
 def get_json(url):
-    """Send GET request and return JSON response. Refresh token if 401."""
-    global ACCESS_TOKEN, HEADERS  # so we can update them
+    """Send GET request and return JSON response (a 401 is retried with a new token by the session auth)."""
+    response = SESSION.get(url)
+    response.raise_for_status()
+    return orjson.loads(response.content)
 
-    response = requests.get(url, headers=HEADERS)
+def get_json_revalidated(url):
+    """
+    GET a small resource that is read several times per run but may change in between
+    (e.g. task statuses). The ETag of the last response is sent as If-None-Match, so an
+    unchanged resource comes back as a bodiless 304 and the stored payload is reused.
+    """
+    stored = ETAG_STORE.get(url)
+    response = SESSION.get(url, headers={"If-None-Match": stored[0]} if stored else None)
 
-    if response.status_code == 401:
-        # refresh token
-        ACCESS_TOKEN = get_access_token()
-        HEADERS = {
-            "Authorization": f"Bearer {ACCESS_TOKEN}",
-            "Accept": "application/json"
-        }
-        response = requests.get(url, headers=HEADERS)
+    if stored and response.status_code == 304:
+        return stored[1]
 
     response.raise_for_status()
-    return response.json()
+    payload = orjson.loads(response.content)
+    etag = response.headers.get("ETag")
+    if etag:
+        ETAG_STORE[url] = (etag, payload)
+    return payload
+
+def single_flight(func):
+    """
+    Share one execution between concurrent calls with the same arguments: the first caller
+    runs func, the others wait for its result. Placed under lru_cache, so cache misses for
+    the same key that race each other cost one request instead of one each.
+    """
+    in_flight = {}
+    lock = threading.Lock()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        with lock:
+            future = in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = in_flight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with lock:
+                del in_flight[key]
+
+    return wrapper
+
+class Memoized:
+    """
+    Memo for a one-argument getter whose entries the writers must be able to drop one by one
+    (lru_cache can only clear everything). Past maxsize the oldest entry is evicted.
+    Thread-safe: a value fetched while an invalidation happened is returned but not stored,
+    so a write racing an in-flight fetch can't leave the stale value behind.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.cache = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def cached_items(self):
+        with self.lock:
+            return list(self.cache.items())
+
+    def invalidate(self, key):
+        with self.lock:
+            self.cache.pop(key, None)
+            self.generation += 1
+
+    def cache_clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.generation += 1
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(key):
+            with self.lock:
+                if key in self.cache:
+                    return self.cache[key]
+                generation = self.generation
+            value = func(key)
+            with self.lock:
+                if generation == self.generation:
+                    self.cache[key] = value
+                    while len(self.cache) > self.maxsize:
+                        del self.cache[next(iter(self.cache))]
+            return value
+
+        wrapper.cached_items = self.cached_items
+        wrapper.invalidate = self.invalidate
+        wrapper.cache_clear = self.cache_clear
+        return wrapper
+
+def iter_items(url):
+    """
+    Stream the items of an unpaginated (pageSize=-1) list response with ijson, instead of
+    holding the whole body and its fully parsed copy in memory.
+    """
+    response = SESSION.get(url, stream=True)
+    response.raise_for_status()
+    # Let urllib3 undo gzip/deflate before ijson reads the raw stream
+    response.raw.decode_content = True
+    with response:
+        yield from ijson.items(response.raw, "items.item", use_float=True)
+
+def iter_all_pages(url, page_size):
+    """
+    Yield every item of a paginated list endpoint, page by page. The first page tells how
+    many pages there are (lastPage, else totalCount); the remaining ones are fetched concurrently
+    while the caller consumes the earlier ones, and are yielded in page order.
+    Endpoints without that metadata are walked serially until a short page.
+    """
+    separator = "&" if "?" in url else "?"
+    page_url = f"{url}{separator}pageSize={page_size}&page="
+
+    first_page = get_json(f"{page_url}1")
+    items = first_page.get("items", [])
+    last_page = first_page.get("lastPage")
+    if last_page is None and first_page.get("totalCount") is not None:
+        last_page = -(-first_page["totalCount"] // page_size)
+
+    if last_page is None:
+        yield from items
+        page = 1
+        while len(items) == page_size:
+            page += 1
+            items = get_json(f"{page_url}{page}").get("items", [])
+            yield from items
+        return
+
+    if last_page <= 1:
+        yield from items
+        return
+
+    with ThreadPoolExecutor(max_workers=TESTRAY_WORKERS) as executor:
+        pages = executor.map(get_json, [f"{page_url}{page}" for page in range(2, last_page + 1)])
+        yield from items
+        for data in pages:
+            yield from data.get("items", [])
 
 def put_json(url, payload):
     """Send PUT request with JSON payload."""
-    headers = HEADERS.copy()
-    headers["Content-Type"] = "application/json"
-    response = requests.put(url, json=payload, headers=headers)
+    response = SESSION.put(url, data=orjson.dumps(payload), headers=HEADERS_JSON)
     response.raise_for_status()
-    return response.json()
+    return orjson.loads(response.content)
 
 
 # ============================ API OPERATIONS ============================
 
+def wait_for_import_task(import_task):
+    """
+    Poll a batch engine import task until it finishes. Raises RuntimeError if it failed,
+    rejected any item or is still running after IMPORT_TASK_TIMEOUT_SECONDS.
+    """
+    deadline = time.monotonic() + IMPORT_TASK_TIMEOUT_SECONDS
+    while import_task.get("executeStatus") not in ("COMPLETED", "FAILED"):
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Import task {import_task.get('id')} did not finish within {IMPORT_TASK_TIMEOUT_SECONDS}s")
+        time.sleep(IMPORT_TASK_POLL_SECONDS)
+        import_task = get_json(f"{IMPORT_TASK_URL}/{import_task['id']}")
+
+    if import_task["executeStatus"] != "COMPLETED" or import_task.get("failedItems"):
+        raise RuntimeError(
+            f"Import task {import_task.get('id')} did not complete: "
+            f"{import_task.get('errorMessage') or import_task.get('failedItems')}"
+        )
+    return import_task
+
+
 def assign_issue_to_case_result_batch(batch_updates):
-    """Update a batch of case results with issues and due statuses."""
-    for item in batch_updates:
-        case_result_id = item["id"]
-        payload = {
+    """
+    Update a batch of case results with issues and due statuses, BATCH_MAX_ITEMS per request.
+    The object batch endpoint runs as an import task, which is waited for, so the updates are
+    applied when this returns; one that fails raises before the caller completes anything on top.
+    If the batch endpoint is not available (404), each case result is updated on its own,
+    for this and every later call.
+    """
+    global BATCH_ENDPOINT_AVAILABLE
+
+    if not batch_updates:
+        return
+    payload = [
+        {
+            "id": item["id"],
             "dueStatus": item["dueStatus"],
             "issues": item["issues"]
         }
-        url = f"{BASE_URL}/caseresults/{case_result_id}"
-        put_json(url, payload)
+        for item in batch_updates
+    ]
+    url = f"{BASE_URL}/caseresults/batch"
+
+    for start in range(0, len(payload), BATCH_MAX_ITEMS):
+        chunk = payload[start:start + BATCH_MAX_ITEMS]
+        if BATCH_ENDPOINT_AVAILABLE:
+            try:
+                import_task = put_json(url, chunk)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                BATCH_ENDPOINT_AVAILABLE = False
+            else:
+                wait_for_import_task(import_task)
+                continue
+        with ThreadPoolExecutor(max_workers=TESTRAY_WORKERS) as executor:
+            list(executor.map(_update_case_result, chunk))
+
+
+def _update_case_result(item):
+    """Per-item fallback of the batch update; the id goes in the URL, not the body."""
+    payload = {
+        "dueStatus": item["dueStatus"],
+        "issues": item["issues"]
+    }
+    put_json(f"{BASE_URL}/caseresults/{item['id']}", payload)
 
 
 def autofill_build(testray_build_id_1, testray_build_id_2):
     """Trigger autofill between two Testray builds."""
     url = f"{TESTRAY_REST_URL}/testray-build-autofill/{testray_build_id_1}/{testray_build_id_2}"
-    response = requests.post(url, headers=HEADERS, data="")
+    response = SESSION.post(url, data="")
     response.raise_for_status()
-    return response.json()
+    return orjson.loads(response.content)
+
+
+def _invalidate_builds_of_task(task_id):
+    """Drop cached builds and build task lists that include this task, without a lookup request."""
+    for build_id, build in get_build_info.cached_items():
+        if any(str(task.get("id")) == str(task_id) for task in build.get("buildToTasks") or []):
+            get_build_info.invalidate(build_id)
+    for build_id, tasks in get_build_tasks.cached_items():
+        if any(str(task.get("id")) == str(task_id) for task in tasks):
+            get_build_tasks.invalidate(build_id)
 
 
 def complete_task(task_id):
@@ -124,11 +492,10 @@ def complete_task(task_id):
             "name": "Complete"
         }
     }
-    headers = HEADERS.copy()
-    headers["Content-Type"] = "application/json"
-    response = requests.patch(url, json=payload, headers=headers)
+    response = SESSION.patch(url, data=orjson.dumps(payload), headers=HEADERS_JSON)
     response.raise_for_status()
-    return response.json()
+    _invalidate_builds_of_task(task_id)
+    return orjson.loads(response.content)
 
 
 def create_task(build):
@@ -142,105 +509,105 @@ def create_task(build):
         }
     }
     url = f"{BASE_URL}/tasks/"
-    headers = HEADERS.copy()
-    headers["Content-Type"] = "application/json"
-    response = requests.post(url, json=payload, headers=headers)
+    response = SESSION.post(url, data=orjson.dumps(payload), headers=HEADERS_JSON)
     response.raise_for_status()
-    return response.json()
+    get_build_info.invalidate(build["id"])
+    get_build_tasks.invalidate(build["id"])
+    return orjson.loads(response.content)
 
 
 def create_testflow(task_id):
     """Create testflow for a task."""
     url = f"{TESTRAY_REST_URL}/testray-testflow/{task_id}"
-    response = requests.post(url, headers=HEADERS, data="")
+    response = SESSION.post(url, data="")
     response.raise_for_status()
-    return response.json()
+    return orjson.loads(response.content)
 
 
-def fetch_case_results(case_id, routine_id, status=None, page_size=500):
-    base_url = f"{TESTRAY_REST_URL}/testray-case-result-history/{case_id}"
-    page = 1
-    all_items = []
-
-    while True:
-        params = (
-                f"testrayRoutineIds={routine_id}"
-                + (f"&status={status}" if status else "")
-                + f"&page={page}&pageSize={page_size}"
-        )
-        url = f"{base_url}?{params}"
-        result = get_json(url)
-        items = result.get("items", [])
-        all_items.extend(items)
-
-        if len(items) < page_size:
-            break  # Last page reached
-        page += 1
-
-    return all_items
+def iter_case_results(case_id, routine_id, status=None, page_size=500):
+    """Yield the result history of a case in a routine, page by page."""
+    url = (
+            f"{TESTRAY_REST_URL}/testray-case-result-history/{case_id}"
+            f"?testrayRoutineIds={routine_id}"
+            + (f"&status={status}" if status else "")
+    )
+    return iter_all_pages(url, page_size)
 
-def get_all_cases_info_from_build(build_id):
-    """Recreate old API behavior with nestedFields for case metadata."""
-    url = f"{BASE_URL}/builds/{build_id}/buildToCaseResult?pageSize=-1&nestedFields=r_caseToCaseResult_c_case"
-    return get_json(url).get("items", [])
+def fetch_case_results(case_id, routine_id, status=None, page_size=500):
+    return list(iter_case_results(case_id, routine_id, status=status, page_size=page_size))
 
 def get_all_builds(routine_id=HEADLESS_ROUTINE_ID):
     """
     Fetch all builds for a given routine, handling pagination.
     Defaults to HEADLESS routine.
     """
-    all_builds = []
-    page = 1
-
-    while True:
-        data = get_routine_builds(routine_id, page=page)
-        items = data.get("items", [])
-        if not items:
-            break
-
-        all_builds.extend(items)
-        if len(items) < 100:  # last page
-            break
-        page += 1
+    url = f"{BASE_URL}/builds?filter=r_routineToBuilds_c_routineId eq '{routine_id}'&sort=dateCreated:desc"
+    all_builds = iter_all_pages(url, page_size=100)
 
     # Sort builds by dateCreated descending
     return sorted(all_builds, key=lambda b: b.get("dateCreated", ""), reverse=True)
 
-def get_all_build_case_results(build_id):
-    """Fetch all case results for a given build (paginated)."""
-    page = 1
-    all_items = []
-
-    while True:
-        url = f"{BASE_URL}/builds/{build_id}/buildToCaseResult?pageSize=500&page={page}"
-        data = get_json(url)
-        items = data.get("items", [])
-        all_items.extend(items)
-
-        if len(items) < 500:
-            break
-        page += 1
-
-    return all_items
-
-@lru_cache(maxsize=None)
+def get_all_build_case_results(build_id, include_case_meta=False, fields=None):
+    """
+    Yield all case results for a given build (paginated, streamed page by page).
+    With include_case_meta, each result also carries its case under r_caseToCaseResult_c_case.
+    fields limits the returned attributes to the ones the caller reads.
+    """
+    params = []
+    if include_case_meta:
+        params.append("nestedFields=r_caseToCaseResult_c_case")
+    if fields:
+        params.append(f"fields={','.join(fields)}")
+
+    url = f"{BASE_URL}/builds/{build_id}/buildToCaseResult"
+    if params:
+        url += "?" + "&".join(params)
+    return iter_all_pages(url, page_size=500)
+
+@Memoized(maxsize=BUILD_CACHE_SIZE)
+@single_flight
 def get_build_info(build_id):
     """Get build metadata, including routine ID and due date."""
     url = f"{BASE_URL}/builds/{build_id}?fields=dueDate,gitHash,name,id,importStatus,r_routineToBuilds_c_routineId&nestedFields=buildToTasks"
     return get_json(url)
 
+@Memoized(maxsize=BUILD_CACHE_SIZE)
+@single_flight
 def get_build_tasks(build_id):
-    """Get tasks associated with a build."""
+    """
+    Get tasks associated with a build. Memoized per build: several entrypoint steps walk the
+    same builds; task writes drop the affected entries, so no revalidation request is needed.
+    """
     url = f"{BASE_URL}/builds/{build_id}/buildToTasks?fields=id,dueStatus"
     return get_json(url).get("items", [])
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=CASE_CACHE_SIZE)
+@single_flight
 def get_case_info(case_id):
-    """Get the name and priority of a test case."""
+    """Get the name and priority of a test case (served from prefetch_cases_info when available)."""
+    prefetched = PREFETCHED_CASES.pop(str(case_id), None)
+    if prefetched is not None:
+        return prefetched
     url = f"{BASE_URL}/cases/{case_id}"
     return get_json(url)
 
+def prefetch_cases_info(case_ids):
+    """
+    Load many cases with one filtered request per CASE_BULK_SIZE ids, so the following
+    get_case_info calls for them need no request of their own.
+    """
+    unique_ids = [str(case_id) for case_id in dict.fromkeys(case_ids) if case_id]
+    chunks = [unique_ids[i:i + CASE_BULK_SIZE] for i in range(0, len(unique_ids), CASE_BULK_SIZE)]
+    urls = [
+        f"{BASE_URL}/cases?filter={' or '.join(f'id eq {case_id}' for case_id in chunk)}&pageSize={len(chunk)}"
+        for chunk in chunks
+    ]
+    with ThreadPoolExecutor(max_workers=TESTRAY_WORKERS) as executor:
+        for data in executor.map(get_json, urls):
+            for case in data.get("items", []):
+                PREFETCHED_CASES[str(case["id"])] = case
+
 def get_case_result(case_result_id):
     url = f"{BASE_URL}/caseresults/{case_result_id}"
     return get_json(url)
@@ -250,27 +617,19 @@ def get_case_count_by_type_in_build(build_id, case_type_id):
     if not case_type_id:
         return 0
 
-    all_items = []
-    page = 1
-    page_size = 500
-
-    while True:
-        url = (f"{BASE_URL}/builds/{build_id}/buildToCaseResult"
-               f"?filter=r_caseToCaseResult_c_case/r_caseTypeToCases_c_caseTypeId eq {case_type_id}"
-               f"&fields=r_caseToCaseResult_c_caseId"
-               f"&pageSize={page_size}&page={page}")
-        data = get_json(url)
-        items = data.get("items", [])
-        all_items.extend(items)
+    url = (f"{BASE_URL}/builds/{build_id}/buildToCaseResult"
+           f"?filter=r_caseToCaseResult_c_case/r_caseTypeToCases_c_caseTypeId eq {case_type_id}"
+           f"&fields=r_caseToCaseResult_c_caseId")
 
-        if len(items) < page_size:
-            break
-        page += 1
-
-    unique_case_ids = {item['r_caseToCaseResult_c_caseId'] for item in all_items if 'r_caseToCaseResult_c_caseId' in item}
+    unique_case_ids = {
+        item['r_caseToCaseResult_c_caseId']
+        for item in iter_all_pages(url, page_size=500)
+        if 'r_caseToCaseResult_c_caseId' in item
+    }
     return len(unique_case_ids)
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=CASE_TYPE_CACHE_SIZE)
+@single_flight
 def get_case_type_id_by_name(case_type_name):
     """Get the ID of a case type by its name."""
     url = f"{BASE_URL}/casetypes?filter=name eq '{case_type_name}'&fields=id"
@@ -280,18 +639,65 @@ def get_case_type_id_by_name(case_type_name):
         return items[0].get("id")
     return None
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=CASE_TYPE_CACHE_SIZE)
+@single_flight
 def get_case_type_name(case_type_id):
     """Get name of a case type by ID."""
     url = f"{BASE_URL}/casetypes/{case_type_id}?fields=name"
     return get_json(url).get("name", "Unknown")
 
 
-@lru_cache(maxsize=None)
+def _load_component_names():
+    """Load (names, created_at) resolved by previous runs; a stale or foreign file starts over."""
+    try:
+        cached = orjson.loads(COMPONENT_CACHE_FILE.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        cached = None
+    if (
+            isinstance(cached, dict)
+            and cached.get("version") == COMPONENT_CACHE_VERSION
+            and isinstance(cached.get("names"), dict)
+            and isinstance(cached.get("created_at"), (int, float))
+            and time.time() - cached["created_at"] < COMPONENT_CACHE_MAX_AGE_SECONDS
+    ):
+        return cached["names"], cached["created_at"]
+    return {}, time.time()
+
+
+def _save_component_names():
+    """
+    Persist component names on exit, only if new ones were resolved. Written to a temp file
+    and renamed, so a concurrent run never reads half a file.
+    """
+    if len(COMPONENT_NAMES) == COMPONENT_NAMES_LOADED:
+        return
+    try:
+        COMPONENT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = COMPONENT_CACHE_FILE.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_bytes(orjson.dumps({
+            "version": COMPONENT_CACHE_VERSION,
+            "created_at": COMPONENT_CACHE_CREATED_AT,
+            "names": COMPONENT_NAMES,
+        }))
+        os.replace(tmp_file, COMPONENT_CACHE_FILE)
+    except OSError as e:
+        print(f"⚠️ Could not save component cache: {e}")
+
+
+COMPONENT_NAMES, COMPONENT_CACHE_CREATED_AT = _load_component_names()
+COMPONENT_NAMES_LOADED = len(COMPONENT_NAMES)
+atexit.register(_save_component_names)
+
+
+@lru_cache(maxsize=COMPONENT_CACHE_SIZE)
+@single_flight
 def get_component_name(component_id):
-    """Get name of a component by ID."""
-    url = f"{BASE_URL}/components/{component_id}?fields=name"
-    return get_json(url).get("name", "Unknown")
+    """Get name of a component by ID (component names are cached on disk across runs)."""
+    key = str(component_id)
+    if key not in COMPONENT_NAMES:
+        url = f"{BASE_URL}/components/{component_id}?fields=name"
+        COMPONENT_NAMES[key] = get_json(url).get("name", "Unknown")
+    return COMPONENT_NAMES[key]
 
 
 def get_routine_builds(routine_id, page=1):
@@ -300,18 +706,28 @@ def get_routine_builds(routine_id, page=1):
     return get_json(url)
 
 
-def get_routine_to_builds():
-    """Fetch all builds for a routine, remove pagination and sort by dateCreated descending."""
-    url = f"{BASE_URL}/routines/{HEADLESS_ROUTINE_ID}/routineToBuilds?fields=dueDate,name,id,importStatus,r_routineToBuilds_c_routineId,dateCreated&pageSize=-1"
-    items = get_json(url).get("items", [])
-    # Sort by dateCreated descending; fallback to empty string if missing
-    return sorted(items, key=lambda b: b.get("dateCreated", ""), reverse=True)
+def get_routine_to_builds(dt_from=None, dt_to=None):
+    """
+    Fetch all builds for a routine, remove pagination and sort by dateCreated descending.
+    dt_from/dt_to (ISO 8601 UTC strings) narrow the builds server-side to dt_from <= dueDate < dt_to.
+    """
+    url = f"{BASE_URL}/routines/{HEADLESS_ROUTINE_ID}/routineToBuilds?fields=dueDate,name,id,importStatus,r_routineToBuilds_c_routineId,dateCreated&pageSize=-1&sort=dateCreated:desc"
+    date_filters = []
+    if dt_from:
+        date_filters.append(f"dueDate ge {dt_from}")
+    if dt_to:
+        date_filters.append(f"dueDate lt {dt_to}")
+    if date_filters:
+        url += f"&filter={' and '.join(date_filters)}"
+    # The server sorts by dateCreated descending; this re-sort is a linear check on ordered input
+    # and only guards the relationship endpoint against ignoring the sort. Missing dates go last.
+    return sorted(iter_items(url), key=lambda b: b.get("dateCreated", ""), reverse=True)
 
 
 def get_subtask_case_results(subtask_id):
     """Get case results under a subtask."""
     url = f"{BASE_URL}/subtasks/{subtask_id}/subtaskToCaseResults?fields=id,executionDate,errors,issues,r_caseToCaseResult_c_caseId,r_componentToCaseResult_c_componentId&pageSize=-1"
-    return get_json(url).get("items", [])
+    return list(iter_items(url))
 
 
 def get_task_build_id(task_id):
@@ -322,12 +738,12 @@ def get_task_build_id(task_id):
 def get_task_status(task_id):
     """Get the status of a task."""
     url = f"{BASE_URL}/tasks/{task_id}?fields=dueStatus"
-    return get_json(url)
+    return get_json_revalidated(url)
 
 def get_task_subtasks(task_id):
     """Get subtasks associated with a task."""
     url = f"{BASE_URL}/tasks/{task_id}/taskToSubtasks?pageSize=-1"
-    return get_json(url).get("items", [])
+    return list(iter_items(url))
 
 
 def reanalyze_task(task_id):
@@ -339,11 +755,10 @@ def reanalyze_task(task_id):
             "name": "In Analysis"
         }
     }
-    headers = HEADERS.copy()
-    headers["Content-Type"] = "application/json"
-    response = requests.patch(url, json=payload, headers=headers)
+    response = SESSION.patch(url, data=orjson.dumps(payload), headers=HEADERS_JSON)
     response.raise_for_status()
-    return response.json()
+    _invalidate_builds_of_task(task_id)
+    return orjson.loads(response.content)
 
 
 from typing import Dict, Any, Optional
@@ -1,22 +1,161 @@
 #!/usr/bin/env python3
 
+import hashlib
 import json
+import re
+import sqlite3
+import struct
+import threading
+from bisect import bisect_left
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, time  # FIX: datetime was used but not imported
-from sentence_transformers import SentenceTransformer, util
+from functools import lru_cache
+from itertools import pairwise
+from pathlib import Path
 
 from liferay.teams.headless.headless_contstants import ComponentMapping
 from utils.liferay_utils.jira_utils.jira_helpers import (
-    get_issue_status_by_key,
+    get_issue_statuses_by_keys,
     create_jira_task,
     get_all_issues,
     close_issue,
 )
-from utils.liferay_utils.testray_utils.testray_api import *
-from utils.liferay_utils.utilities import *
+from utils.liferay_utils.testray_utils.testray_api import (
+    HEADLESS_ROUTINE_ID,
+    STATUS_FAILED_BLOCKED_TESTFIX,
+    TESTRAY_WORKERS,
+    assign_issue_to_case_result_batch,
+    autofill_build,
+    complete_task,
+    create_task,
+    create_testflow,
+    get_all_build_case_results,
+    get_build_info,
+    get_build_tasks,
+    get_case_count_by_type_in_build,
+    get_case_info,
+    get_case_result,
+    get_case_type_id_by_name,
+    get_case_type_name,
+    get_component_name,
+    get_subtask_case_results,
+    get_task_build_id,
+    get_task_status,
+    get_task_subtasks,
+    iter_case_results,
+    prefetch_cases_info,
+    update_subtask_status,
+)
+from utils.liferay_utils.utilities import (
+    format_duration,
+    get_current_quarter_info,
+    normalize_error,
+    parse_execution_date,
+)
+
+
+@lru_cache(maxsize=1)
+def _get_model():
+    """
+    Heavy model loaded once, on the first similarity check (not at import): importing
+    sentence_transformers pulls in torch, which entrypoints that never compare errors skip.
+    On a CUDA machine it runs there in fp16; the cached vectors are fp16 either way.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if torch.cuda.is_available():
+        return SentenceTransformer('all-MiniLM-L6-v2', device="cuda").half()
+    return SentenceTransformer('all-MiniLM-L6-v2')
+
+
+# Embeddings of normalized errors, keyed by sha1 of the text and stored as fp16
+EMBEDDING_CACHE_FILE = Path.home() / ".cache" / "testray_embeddings.sqlite3"
+EMBEDDING_CACHE_LOCK = threading.Lock()
+# Keys per SELECT; stays under SQLite's bound-parameter limit
+EMBEDDING_CACHE_CHUNK = 500
+# In-process layer over the file: key -> fp16 tensor, oldest evicted past the size
+EMBEDDING_MEMO = {}
+EMBEDDING_MEMO_SIZE = 4096
+
+
+@lru_cache(maxsize=1)
+def _embedding_cache():
+    EMBEDDING_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(EMBEDDING_CACHE_FILE, check_same_thread=False)
+    conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+    return conn
+
 
-# Heavy model loaded once here (not in entrypoint)
-model = SentenceTransformer('all-MiniLM-L6-v2')
+def _embedding_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _encode_errors(texts):
+    """
+    Normalized embeddings for texts, one row each. Vectors already used in this process come
+    from memory, vectors seen on earlier runs from the on-disk cache; only the remaining
+    misses go through the model, in one batch.
+    """
+    import torch
+
+    keys = [_embedding_key(text) for text in texts]
+
+    with EMBEDDING_CACHE_LOCK:
+        vectors = {key: EMBEDDING_MEMO[key] for key in keys if key in EMBEDDING_MEMO}
+        unknown = [key for key in dict.fromkeys(keys) if key not in vectors]
+
+        blobs = {}
+        conn = _embedding_cache() if unknown else None
+        for i in range(0, len(unknown), EMBEDDING_CACHE_CHUNK):
+            chunk = unknown[i:i + EMBEDDING_CACHE_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            blobs.update(conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ))
+
+        misses = {key: text for key, text in zip(keys, texts) if key not in vectors and key not in blobs}
+        if misses:
+            with torch.inference_mode():
+                encoded = _get_model().encode(
+                    list(misses.values()), batch_size=64, convert_to_tensor=True, normalize_embeddings=True
+                ).tolist()
+            fresh = {key: struct.pack(f"<{len(vec)}e", *vec) for key, vec in zip(misses, encoded)}
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", fresh.items())
+            blobs.update(fresh)
+
+        # Hits and misses both go through the fp16 round trip so scores don't depend on cache state
+        for key, blob in blobs.items():
+            vectors[key] = EMBEDDING_MEMO[key] = torch.frombuffer(bytearray(blob), dtype=torch.float16)
+        while len(EMBEDDING_MEMO) > EMBEDDING_MEMO_SIZE:
+            del EMBEDDING_MEMO[next(iter(EMBEDDING_MEMO))]
+
+    # Widened once for the matmul
+    return torch.stack([vectors[key] for key in keys]).float()
+
+
+# Status filter of the case result history, as a set for per-item membership checks
+FAILED_BLOCKED_TESTFIX_STATUSES = frozenset(STATUS_FAILED_BLOCKED_TESTFIX.split(","))
+
+# Errors that mean the test never really ran; one compiled alternation scans each error once
+SKIP_ERROR_KEYWORDS = (
+    "Failed prior to running test",
+    "PortalLogAssertorTest#testScanXMLLog",
+    "Skipped test",
+    "The build failed prior to running the test",
+    "test-portal-testsuite-upstream-downstream(master) timed out after",
+    "TEST_SETUP_ERROR",
+    "Unable to run test on CI",
+)
+SKIP_ERROR_RE = re.compile("|".join(map(re.escape, SKIP_ERROR_KEYWORDS)))
+
+# Jira status name per issue key, filled in bulk while scanning case history
+ISSUE_STATUSES = {}
+
+# Cosine similarity from which two normalized errors count as the same failure
+ERROR_SIMILARITY_THRESHOLD = 0.8
 
 # ---------------------------------------------------------------------------
 # Entry-point orchestration helpers
@@ -33,41 +172,53 @@ def get_latest_done_build(builds):
     return latest_build
 
 
-def prepare_task(jira_connection, builds, latest_build):
+def _acquire_task(build, task_is_done):
     """
-    Ensure a task exists for latest_build and is actionable.
-    Returns (task_id or None, latest_build_id).
+    Task selection shared by prepare_task and find_or_create_task: create a task (and its
+    testflow) when the build has none, otherwise take its task unless it is ABANDONED or
+    task_is_done(task_id) says there is nothing left to do.
+    Returns task_id or None.
     """
-    latest_build_id = latest_build["id"]
-    build_to_tasks = get_build_tasks(latest_build_id)
+    build_to_tasks = get_build_tasks(build["id"])
 
     if not build_to_tasks:
-        print(f"[CREATE] No tasks for build '{latest_build['name']}', creating task and testflow.")
-        task = create_task(latest_build)
+        print(f"[CREATE] No tasks for build '{build['name']}', creating task and testflow.")
+        task = create_task(build)
         create_testflow(task["id"])
-        print(f"✔ Using build {latest_build_id} and task {task['id']}")
-        return task["id"], latest_build_id
+        return task["id"]
 
-    for task in build_to_tasks:
-        due_status_key = task.get("dueStatus", {}).get("key")
-        if due_status_key == "ABANDONED":
-            print(f"Task {task['id']} has been ABANDONED.")
-            return None, latest_build_id
+    task = build_to_tasks[0]
+    due_status_key = _due_status_key(task)
+    if due_status_key == "ABANDONED":
+        print(f"Task {task['id']} has been ABANDONED.")
+        return None
 
-        print(f"[USE] Using existing task {task['id']} with status {due_status_key}.")
-        task_id = task["id"]
+    print(f"[USE] Using existing task {task['id']} with status {due_status_key}.")
+    if task_is_done(task["id"]):
+        return None
+    return task["id"]
 
-        status = get_task_status(task_id)
-        if status.get("dueStatus", {}).get("key") == "COMPLETE":
-            print(f"✔ Task {task_id} for build {latest_build_id} is now complete. No further processing required.")
-            return None, latest_build_id
 
-        print(f"✔ Using build {latest_build_id} and task {task_id}")
-        return task_id, latest_build_id
+def prepare_task(jira_connection, builds, latest_build):
+    """
+    Ensure a task exists for latest_build and is actionable.
+    Returns (task_id or None, latest_build_id).
+    """
+    latest_build_id = latest_build["id"]
+
+    def task_is_done(task_id):
+        if not _is_complete(get_task_status(task_id)):
+            return False
+        print(f"✔ Task {task_id} for build {latest_build_id} is now complete. No further processing required.")
+        return True
 
-    return None, latest_build_id
+    task_id = _acquire_task(latest_build, task_is_done)
+    if task_id:
+        print(f"✔ Using build {latest_build_id} and task {task_id}")
+    return task_id, latest_build_id
 
 
+@lru_cache(maxsize=None)
 def _headless_epic_jql():
     _, quarter_number, year = get_current_quarter_info()
     return (
@@ -93,14 +244,7 @@ def maybe_autofill_from_previous(builds, latest_build):
     """
     If some previous build has a COMPLETED task, autofill into the latest build.
     """
-    def _first_completed_build():
-        for b in builds:
-            for t in get_build_tasks(b["id"]):
-                if t.get("dueStatus", {}).get("key") == "COMPLETE":
-                    return b
-        return None
-
-    latest_complete = _first_completed_build()
+    latest_complete = get_latest_build_with_completed_task(builds)
     if latest_complete:
         print("Autofill from latest analysed build...")
         autofill_build(latest_complete["id"], latest_build["id"])
@@ -110,32 +254,32 @@ def maybe_autofill_from_previous(builds, latest_build):
 # Subtask processing — scan → resolve (by error group) → stage → complete
 # ---------------------------------------------------------------------------
 
-def process_task_subtasks(*, task_id, latest_build_id, jira_connection, epic):
+def process_task_subtasks(*, task_id, subtasks, latest_build_id, jira_connection, epic):
     """
-    Iterate subtasks, detect unique failures grouped by error, reuse or create Jira tasks,
+    Iterate the task's subtasks, detect unique failures grouped by error, reuse or create Jira tasks,
     and build batched updates and completion list.
     Returns (batch_updates, subtasks_to_complete, subtask_to_issues).
     """
-    subtasks = get_task_subtasks(task_id)
+    results_by_subtask = _fetch_subtask_case_results(subtasks)
 
     batch_updates = []
-    subtasks_to_complete = []
-    subtask_to_issues = defaultdict(set)
+    subtasks_to_complete = {}  # ordered set: each subtask is completed at most once
+    subtask_to_issues = defaultdict(list)
 
     for subtask in subtasks:
         subtask_id = subtask["id"]
-        results = get_subtask_case_results(subtask_id)
+        results = results_by_subtask[subtask_id]
         if not results:
             continue
 
         # Always collect any pre-existing result-level issues so they get bubbled up
         existing_issue_keys = _collect_result_issue_keys(results)
         if existing_issue_keys:
-            subtask_to_issues[subtask_id].update(existing_issue_keys)
+            subtask_to_issues[subtask_id].extend(existing_issue_keys)
 
         # 1) Handle already-complete subtasks (backfill issues once if needed)
-        if _is_subtask_complete(subtask):
-            _backfill_subtask_issues_if_needed(subtask_id, subtask, results)
+        if _is_complete(subtask):
+            _backfill_subtask_issues_if_needed(subtask_id, subtask, existing_issue_keys)
             continue
 
         # 2) Scan current results for unique failures (skip known errors)
@@ -156,7 +300,7 @@ def process_task_subtasks(*, task_id, latest_build_id, jira_connection, epic):
             )
             batch_updates.extend(updates)
             if issues_str:
-                subtask_to_issues[subtask_id].add(issues_str)
+                subtask_to_issues[subtask_id].append(issues_str)
             resolved_all_groups = resolved_all_groups and resolved
 
         # 3) Decide if subtask is fully handled
@@ -165,56 +309,111 @@ def process_task_subtasks(*, task_id, latest_build_id, jira_connection, epic):
 
         # 4) Stage subtask for completion if everything is handled
         if all_handled:
-            subtasks_to_complete.append(subtask_id)
+            subtasks_to_complete[subtask_id] = None
 
     return batch_updates, subtasks_to_complete, subtask_to_issues
 
 
-def finalize_task_completion(*, task_id, latest_build_id, jira_connection,
+def finalize_task_completion(*, task_id, subtasks, latest_build_id, jira_connection,
                              subtasks_to_complete, subtask_to_issues, batch_updates):
     """
     Apply batched updates, complete subtasks, close stale Jira issues, and complete the task.
+    `subtasks` is the list process_task_subtasks worked on; it is not refetched.
     """
     # Apply batched case result updates first (assign issues to results)
     if batch_updates:
         assign_issue_to_case_result_batch(batch_updates)
 
     # Mark staged subtasks as COMPLETE (aggregating issues if provided)
-    for subtask_id in subtasks_to_complete:
-        issues_to_add = _join_issues(subtask_to_issues.get(subtask_id))
-        print(f"✔ Marking subtask {subtask_id} as complete and associating issues: {issues_to_add}")
-        update_subtask_status(subtask_id, issues=issues_to_add)
+    completed_subtasks = _complete_subtasks(subtasks_to_complete, subtask_to_issues)
 
     # Check if all subtasks are done
-    subtasks = get_task_subtasks(task_id)
-    if not all(s.get("dueStatus", {}).get("key") == "COMPLETE" for s in subtasks):
+    subtasks = _subtasks_after_updates(subtasks, completed_subtasks, subtask_to_issues)
+    seen_issue_keys = _collect_issue_keys_if_all_complete(subtasks)
+    if seen_issue_keys is None:
         print(f"✔ Task {task_id} is not completed. Further processing required.")
         return
 
     # Close stale open routine tasks in Jira that were not reproduced in this run
-    seen_issue_keys = _collect_issue_keys_from_subtasks(subtasks)
     _close_stale_routine_tasks(jira_connection, latest_build_id, seen_issue_keys)
 
     print(f"✔ All subtasks are complete, completing task {task_id}")
     complete_task(task_id)
     print(f"✔ Task {task_id} is now complete. No further processing required.")
 
+
+def _complete_subtasks(subtasks_to_complete, subtask_to_issues):
+    """
+    Send the staged subtask updates concurrently. A failed update is reported and left out
+    of the returned ids, so the task is not completed on top of it.
+    """
+    def complete(subtask_id):
+        issues_to_add = _join_issues(subtask_to_issues.get(subtask_id))
+        print(f"✔ Marking subtask {subtask_id} as complete and associating issues: {issues_to_add}")
+        update_subtask_status(subtask_id, issues=issues_to_add)
+
+    with ThreadPoolExecutor(max_workers=TESTRAY_WORKERS) as executor:
+        futures = {subtask_id: executor.submit(complete, subtask_id) for subtask_id in subtasks_to_complete}
+
+    completed = {}
+    for subtask_id, future in futures.items():
+        error = future.exception()
+        if error:
+            print(f"⚠️ Could not mark subtask {subtask_id} as complete: {error}")
+        else:
+            completed[subtask_id] = None
+    return completed
+
 # ---- scanning, grouping & resolving helpers -------------------------------------
 
-def _is_subtask_complete(subtask):
-    return subtask.get("dueStatus", {}).get("key") == "COMPLETE"
+def _fetch_subtask_case_results(subtasks):
+    """
+    Fetch the case results of every subtask concurrently.
+    Returns {subtask_id: results}.
+    """
+    subtask_ids = [s["id"] for s in subtasks]
+    with ThreadPoolExecutor(max_workers=TESTRAY_WORKERS) as executor:
+        return dict(zip(subtask_ids, executor.map(get_subtask_case_results, subtask_ids)))
+
+
+def _due_status_key(item):
+    """dueStatus key of a task/subtask/status payload, or None; no throwaway dict on a miss."""
+    due_status = item.get("dueStatus")
+    return due_status.get("key") if due_status else None
+
+
+def _is_complete(item):
+    return _due_status_key(item) == "COMPLETE"
 
 
-def _backfill_subtask_issues_if_needed(subtask_id, subtask, results):
+def _subtasks_after_updates(subtasks, subtasks_to_complete, subtask_to_issues):
+    """
+    Mirror the subtask writes of this run onto the loaded subtasks instead of refetching them:
+    staged subtasks became COMPLETE with their joined issues, and already-complete subtasks
+    without issues were backfilled from their results.
+    """
+    updated = []
+    for s in subtasks:
+        issues = _join_issues(subtask_to_issues.get(s["id"]))
+        if s["id"] in subtasks_to_complete:
+            s = {**s, "dueStatus": {"key": "COMPLETE", "name": "Complete"}}
+            if issues:
+                s["issues"] = issues
+        elif _is_complete(s) and not s.get("issues") and issues:
+            s = {**s, "issues": issues}
+        updated.append(s)
+    return updated
+
+
+def _backfill_subtask_issues_if_needed(subtask_id, subtask, result_issue_keys):
     """
     When a subtask is COMPLETE but the aggregated 'issues' field is empty,
-    aggregate from result-level 'issues' and write once.
+    write the result-level issue keys (already collected by the caller) once.
     """
     if subtask.get("issues"):
         return
-    issues = {r.get("issues") for r in results if r.get("issues")}
-    if issues:
-        issues_to_add = _join_issues(issues)
+    issues_to_add = _join_issues(result_issue_keys)
+    if issues_to_add:
         update_subtask_status(subtask_id, issues=issues_to_add)
 
 
@@ -246,6 +445,7 @@ def _scan_unique_failures(subtask_id, results):
         # Consider as unique failure (unhandled)
         unique_failures.append({
             "error": error,
+            "error_norm": normalize_error(error),
             "subtask_id": subtask_id,
             "case_id": r["r_caseToCaseResult_c_caseId"],
             "component_id": r.get("r_componentToCaseResult_c_componentId"),
@@ -261,8 +461,7 @@ def _group_failures_by_error(unique_failures):
     """
     groups = defaultdict(list)
     for f in unique_failures:
-        key = normalize_error(f["error"])
-        groups[key].append(f)
+        groups[f["error_norm"]].append(f)
     return groups
 
 
@@ -311,6 +510,16 @@ def _blocked_update(result_id, due_status_dict, issues_str):
     return {"id": result_id, "dueStatus": due_status_dict, "issues": issues_str}
 
 
+def _iter_issue_keys(issues_str):
+    """Yield the trimmed, non-empty keys of one comma-separated issues value (or None)."""
+    if not issues_str:
+        return
+    for key in str(issues_str).split(","):
+        key = key.strip()
+        if key:
+            yield key
+
+
 def _join_issues(issues_iterable):
     """
     Normalize a collection (or None) of issue strings into a single CSV or None.
@@ -320,27 +529,22 @@ def _join_issues(issues_iterable):
         return None
     parts = set()
     for chunk in issues_iterable:
-        if not chunk:
-            continue
-        for key in str(chunk).split(","):
-            key = key.strip()
-            if key:
-                parts.add(key)
+        parts.update(_iter_issue_keys(chunk))
     if not parts:
         return None
     return ", ".join(sorted(parts))
 
 
-def _collect_issue_keys_from_subtasks(subtasks):
+def _collect_issue_keys_if_all_complete(subtasks):
+    """
+    Single pass over the subtasks: return the issue keys they carry,
+    or None as soon as one of them is not COMPLETE.
+    """
     seen_issue_keys = set()
     for s in subtasks:
-        issues_str = s.get("issues", "")
-        if not issues_str:
-            continue
-        for k in issues_str.split(","):
-            k = k.strip()
-            if k:
-                seen_issue_keys.add(k)
+        if not _is_complete(s):
+            return None
+        seen_issue_keys.update(_iter_issue_keys(s.get("issues")))
     return seen_issue_keys
 
 def _collect_result_issue_keys(results):
@@ -350,13 +554,7 @@ def _collect_result_issue_keys(results):
     """
     keys = set()
     for r in results:
-        issues = r.get("issues")
-        if not issues:
-            continue
-        for k in str(issues).split(","):
-            k = k.strip()
-            if k:
-                keys.add(k)
+        keys.update(_iter_issue_keys(r.get("issues")))
     return keys
 
 def _close_stale_routine_tasks(jira_connection, latest_build_id, seen_issue_keys):
@@ -370,8 +568,9 @@ def _close_stale_routine_tasks(jira_connection, latest_build_id, seen_issue_keys
     if to_close:
         build_hash = get_current_build_hash(latest_build_id)
         print(f"ℹ Found {len(to_close)} issues to close as they are not reproducible in this run.")
-        for issue_key in to_close:
-            close_issue(jira_connection, issue_key, build_hash)
+        # close_issue reports its own failures, so one bad issue doesn't stop the rest
+        with ThreadPoolExecutor(max_workers=TESTRAY_WORKERS) as executor:
+            list(executor.map(lambda issue_key: close_issue(jira_connection, issue_key, build_hash), to_close))
 
 # ---------------------------------------------------------------------------
 # KPI helper
@@ -386,24 +585,7 @@ def report_aft_ratio_for_latest(builds):
     if not latest_build:
         return
 
-    # Beginning-of-quarter build discovery
-    quarter_start_date, _, _ = get_current_quarter_info()
-    quarter_start = datetime.combine(quarter_start_date, time.min)
-
-    best_build = None
-    best_delta = None
-    for b in builds:
-        due_str = b.get("dueDate")
-        if not due_str:
-            continue
-        dt = parse_execution_date(due_str)
-        if not dt or dt < quarter_start:
-            continue
-        delta = dt - quarter_start
-        if best_delta is None or delta < best_delta:
-            best_delta = delta
-            best_build = b
-
+    best_build = _find_quarter_start_build(builds)
     if not best_build:
         print("✘ Could not find a build from the beginning of the quarter to calculate test ratio.")
         return
@@ -415,8 +597,12 @@ def report_aft_ratio_for_latest(builds):
         return
 
     print("⏳ Calculating automated functional test counts...")
-    start_of_quarter_count = get_case_count_by_type_in_build(best_build["id"], aft_case_type_id)
-    current_count = get_case_count_by_type_in_build(latest_build_id, aft_case_type_id)
+    # Both builds are counted concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        start_of_quarter_count, current_count = executor.map(
+            lambda build_id: get_case_count_by_type_in_build(build_id, aft_case_type_id),
+            (best_build["id"], latest_build_id),
+        )
     print("✔ Counts calculated.")
 
     report_poshi_tests_decrease(start_of_quarter_count, current_count)
@@ -475,7 +661,6 @@ def process_summary_result(
 
     case_id = summary_result.get("r_caseToCaseResult_c_caseId")
     result_error = summary_result.get("errors", "")
-    result_error_norm = normalize_error(result_error)
 
     case_id_to_result[case_id] = summary_result
     existing_issue = summary_result.get("issues")
@@ -487,6 +672,9 @@ def process_summary_result(
     if existing_issue:
         return True, None, False
 
+    # Only results that still need analysis pay for normalization
+    result_error_norm = normalize_error(result_error)
+
     if is_module_integration_test(case_id):
         is_flaky = False
     else:
@@ -512,6 +700,22 @@ def sort_cases_by_duration(subtask_case_pairs, case_duration_lookup):
     return sorted(subtask_case_pairs, key=lambda pair: safe_duration(pair[1]))
 
 
+def _fetch_case_bundle(case_id, component_id, build_id, history_cache):
+    """
+    Gather everything build_case_rows needs for one case (metadata and git hashes).
+    """
+    case_info = get_case_info(case_id)
+    case_type_id = case_info.get("r_caseTypeToCases_c_caseTypeId")
+    passing_hash, failing_hash = get_git_hash_range(case_id, build_id, history_cache)
+    return {
+        "case_name": case_info.get("name", "N/A"),
+        "case_type_name": get_case_type_name(case_type_id) if case_type_id else "Unknown",
+        "component_name": get_component_name(component_id) if component_id else "Unknown",
+        "passing_hash": passing_hash,
+        "failing_hash": failing_hash,
+    }
+
+
 def build_case_rows(sorted_cases, case_duration_lookup, build_id, history_cache):
     printed_rows = []
     rca_info = None
@@ -521,91 +725,102 @@ def build_case_rows(sorted_cases, case_duration_lookup, build_id, history_cache)
 
     component_name = "Unknown"
 
-    for _, case_id, component_id in sorted_cases:
+    prefetch_cases_info(case_id for _, case_id, _ in sorted_cases)
+
+    def fetch(case):
+        _, case_id, component_id = case
         try:
-            case_info = get_case_info(case_id)
-            case_name = case_info.get("name", "N/A")
-            case_type_id = case_info.get("r_caseTypeToCases_c_caseTypeId")
-            case_type_name = get_case_type_name(case_type_id) if case_type_id else "Unknown"
-            component_name = get_component_name(component_id) if component_id else "Unknown"
-            raw_duration = case_duration_lookup.get(int(case_id))
-            duration = raw_duration if isinstance(raw_duration, (int, float)) else None
-
-            passing_hash = get_last_passing_git_hash(case_id, build_id, history_cache)
-            failing_hash = get_first_failing_git_hash(case_id, build_id, history_cache)
-
-            github_compare = (
-                f"https://github.com/liferay/liferay-portal/compare/{passing_hash}...{failing_hash}"
-                if passing_hash and failing_hash else "###"
-            )
+            return _fetch_case_bundle(case_id, component_id, build_id, history_cache)
+        except Exception as e:
+            print(f"[ERROR] Failed to fetch data for case_id={case_id} → {e}")
+            return None
 
-            batch_name, test_selector = get_batch_info(case_name, case_type_name)
+    # Fetch concurrently, then build rows in sorted order so the first RCA match still wins
+    with ThreadPoolExecutor(max_workers=TESTRAY_WORKERS) as executor:
+        bundles = list(executor.map(fetch, sorted_cases))
 
-            if not rca_info and batch_name and test_selector:
-                rca_info = build_rca_block(batch_name, test_selector, github_compare)
-                rca_batch = batch_name
-                rca_selector = test_selector
-                rca_compare = github_compare
+    for (_, case_id, _), bundle in zip(sorted_cases, bundles):
+        if bundle is None:
+            continue
 
-            elif not rca_info:
-                rca_info = f"\nCompare: {github_compare}"
+        case_name = bundle["case_name"]
+        component_name = bundle["component_name"]
+        raw_duration = case_duration_lookup.get(int(case_id))
+        duration = raw_duration if isinstance(raw_duration, (int, float)) else None
 
-            row = [case_name, format_duration(duration), component_name]
-            printed_rows.append(row)
+        passing_hash = bundle["passing_hash"]
+        failing_hash = bundle["failing_hash"]
 
-        except Exception as e:
-            print(f"[ERROR] Failed to fetch data for case_id={case_id} → {e}")
+        github_compare = (
+            f"https://github.com/liferay/liferay-portal/compare/{passing_hash}...{failing_hash}"
+            if passing_hash and failing_hash else "###"
+        )
 
-    return printed_rows, rca_info, rca_batch, rca_selector, rca_compare, component_name
+        batch_name, test_selector = get_batch_info(case_name, bundle["case_type_name"])
 
-def get_last_passing_git_hash(case_id, build_id, history_cache):
-    entire_history = history_cache.get(case_id)
-    if entire_history is None:
-        entire_history = get_case_result_history_for_routine(case_id)
-        history_cache[case_id] = entire_history
+        if not rca_info and batch_name and test_selector:
+            rca_info = build_rca_block(batch_name, test_selector, github_compare)
+            rca_batch = batch_name
+            rca_selector = test_selector
+            rca_compare = github_compare
 
-    result_history_for_build = filter_case_result_history_by_build(entire_history, build_id)
-    if not result_history_for_build:
-        return None
+        elif not rca_info:
+            rca_info = f"\nCompare: {github_compare}"
 
-    failing_hash_execution_date = result_history_for_build[0].get('executionDate')
-    item = get_last_passing_result(entire_history, failing_hash_execution_date)
-    last_passing_hash = item.get('gitHash') if item else None
-    return last_passing_hash
+        row = [case_name, format_duration(duration), component_name]
+        printed_rows.append(row)
 
+    return printed_rows, rca_info, rca_batch, rca_selector, rca_compare, component_name
 
-def get_first_failing_git_hash(case_id, build_id, history_cache):
+def _build_failure_window(case_id, build_id, history_cache):
     """
-    Find the first failing git hash after the last passing run for this case.
+    (entire_history, latest result of the case in build_id, last passing result before it),
+    or None when the case has no result in the build.
     """
     entire_history = history_cache.get(case_id)
     if entire_history is None:
         entire_history = get_case_result_history_for_routine(case_id)
         history_cache[case_id] = entire_history
 
-    if not entire_history:
+    # History is newest first, so the first match is the latest run in the build
+    build_result = next((item for item in entire_history if item.get("testrayBuildId") == build_id), None)
+    if build_result is None:
         return None
 
-    result_history_for_build = filter_case_result_history_by_build(entire_history, build_id)
-    if not result_history_for_build:
-        return None
+    last_passing = get_last_passing_result(entire_history, build_result.get("executionDate"))
+    return entire_history, build_result, last_passing
 
-    failing_execution_date = result_history_for_build[0].get("executionDate")
 
-    last_passing = get_last_passing_result(entire_history, failing_execution_date)
+def _first_failing_hash_after(entire_history, build_result, last_passing):
     if not last_passing:
-        return result_history_for_build[0].get("gitHash")
+        return build_result.get("gitHash")
 
+    # History is sorted newest first, so the runs after the last pass are a prefix of it;
+    # bisect for its end instead of parsing every date (undated runs sort last and are skipped)
     last_pass_date = parse_execution_date(last_passing["executionDate"])
-    for item in reversed(entire_history):
-        exec_date = parse_execution_date(item.get("executionDate"))
-        if not exec_date:
-            continue
-        if exec_date > last_pass_date and item.get("status") in STATUS_FAILED_BLOCKED_TESTFIX:
+    after_pass_count = bisect_left(
+        entire_history, True, key=lambda item: _execution_sort_key(item) <= last_pass_date
+    )
+    for item in reversed(entire_history[:after_pass_count]):
+        if item.get("status") in FAILED_BLOCKED_TESTFIX_STATUSES:
             return item.get("gitHash")
 
     return None
 
+
+def get_git_hash_range(case_id, build_id, history_cache):
+    """
+    (last passing git hash, first failing git hash after it) for this case, from one history
+    lookup; either may be None.
+    """
+    window = _build_failure_window(case_id, build_id, history_cache)
+    if window is None:
+        return None, None
+    entire_history, build_result, last_passing = window
+    passing_hash = last_passing.get('gitHash') if last_passing else None
+    return passing_hash, _first_failing_hash_after(entire_history, build_result, last_passing)
+
+
 def get_batch_info(case_name, case_type_name):
     if case_type_name == "Playwright Test":
         selector = case_name.split(" >")[0] if " >" in case_name else case_name
@@ -618,84 +833,80 @@ def get_batch_info(case_name, case_type_name):
     return None, None
 
 
+# Root Cause Analysis job parameters, as plain text and as HTML
+RCA_TEXT_TEMPLATE = (
+    "\nParameters to run Root Cause Analysis on https://test-1-1.liferay.com/job/root-cause-analysis-tool/ :\n"
+    "PORTAL_BATCH_NAME: {batch_name}\n"
+    "PORTAL_BATCH_TEST_SELECTOR: {test_selector}\n"
+    "PORTAL_BRANCH_SHAS: {github_compare}\n"
+    "PORTAL_GITHUB_URL: https://github.com/liferay/liferay-portal/tree/master\n"
+    "PORTAL_UPSTREAM_BRANCH_NAME: master"
+)
+RCA_HTML_TEMPLATE = (
+    "<p>Parameters to run "
+    "<a href='https://test-1-1.liferay.com/job/root-cause-analysis-tool/' target='_blank'>"
+    "Root Cause Analysis Tool</a>:</p>"
+    "<pre><b>PORTAL_BATCH_NAME</b>: {batch_name}\n"
+    "<b>PORTAL_BATCH_TEST_SELECTOR</b>: {test_selector}\n"
+    "<b>PORTAL_BRANCH_SHAS</b>: <a href='{github_compare}' target='_blank'>{github_compare}</a>\n"
+    "<b>PORTAL_GITHUB_URL</b>: <a href='https://github.com/liferay/liferay-portal/tree/master' target='_blank'>"
+    "https://github.com/liferay/liferay-portal/tree/master</a>\n"
+    "<b>PORTAL_UPSTREAM_BRANCH_NAME</b>: master</pre>"
+)
+
+
 def build_rca_block(batch_name, test_selector, github_compare):
-    return (
-        "\nParameters to run Root Cause Analysis on https://test-1-1.liferay.com/job/root-cause-analysis-tool/ :\n"
-        f"PORTAL_BATCH_NAME: {batch_name}\n"
-        f"PORTAL_BATCH_TEST_SELECTOR: {test_selector}\n"
-        f"PORTAL_BRANCH_SHAS: {github_compare}\n"
-        f"PORTAL_GITHUB_URL: https://github.com/liferay/liferay-portal/tree/master\n"
-        f"PORTAL_UPSTREAM_BRANCH_NAME: master"
+    return RCA_TEXT_TEMPLATE.format(
+        batch_name=batch_name, test_selector=test_selector, github_compare=github_compare
     )
 
 
 def build_rca_html_block(batch_name, test_selector, github_compare):
-    return (
-            "<p>Parameters to run "
-            "<a href='https://test-1-1.liferay.com/job/root-cause-analysis-tool/' target='_blank'>"
-            "Root Cause Analysis Tool</a>:</p>"
-            "<pre><b>PORTAL_BATCH_NAME</b>: " + batch_name + "\n"
-                                                             "<b>PORTAL_BATCH_TEST_SELECTOR</b>: " + test_selector + "\n"
-                                                                                                                     "<b>PORTAL_BRANCH_SHAS</b>: <a href='" + github_compare + "' target='_blank'>" + github_compare + "</a>\n"
-                                                                                                                                                                                                                       "<b>PORTAL_GITHUB_URL</b>: <a href='https://github.com/liferay/liferay-portal/tree/master' target='_blank'>"
-                                                                                                                                                                                                                       "https://github.com/liferay/liferay-portal/tree/master</a>\n"
-                                                                                                                                                                                                                       "<b>PORTAL_UPSTREAM_BRANCH_NAME</b>: master</pre>"
+    return RCA_HTML_TEMPLATE.format(
+        batch_name=batch_name, test_selector=test_selector, github_compare=github_compare
     )
 
 
-def get_build_from_beginning_of_current_quarter(builds):
+def _find_quarter_start_build(builds):
+    """Earliest build due on or after the start of the current quarter, or None."""
     quarter_start_date, _, _ = get_current_quarter_info()
     quarter_start = datetime.combine(quarter_start_date, time.min)
 
-    best_build = None
-    best_delta = None
-
-    for build in builds:
-        due_str = build.get("dueDate")
-        if not due_str:
-            continue
-
-        dt = parse_execution_date(due_str)
-        if not dt or dt < quarter_start:
-            continue
+    candidates = [
+        (dt, build)
+        for build in builds
+        if build.get("dueDate")
+        and (dt := parse_execution_date(build["dueDate"]))
+        and dt >= quarter_start
+    ]
+    return min(candidates, key=lambda pair: pair[0])[1] if candidates else None
 
-        delta = dt - quarter_start
-        if best_delta is None or delta < best_delta:
-            best_delta = delta
-            best_build = build
 
+def get_build_from_beginning_of_current_quarter(builds):
+    best_build = _find_quarter_start_build(builds)
     return best_build["id"] if best_build else None
 
 
 def find_or_create_task(build, jira_connection, latest_build_id):
-    build_to_tasks = get_build_tasks(build["id"])
-
-    if not build_to_tasks:
-        print(f"[CREATE] No tasks for build '{build['name']}', creating task and testflow.")
-        task = create_task(build)
-        create_testflow(task["id"])
-        return task["id"]
-
-    for task in build_to_tasks:
-        due_status_key = task.get("dueStatus", {}).get("key")
-        if due_status_key == "ABANDONED":
-            print(f"Task {task['id']} has been ABANDONED.")
-            return None
-        print(f"[USE] Using existing task {task['id']} with status {due_status_key}.")
-        task_id = task["id"]
+    def task_is_done(task_id):
         subtasks = get_task_subtasks(task_id)
-        if check_and_complete_task_if_all_subtasks_done(task_id, subtasks, jira_connection, latest_build_id):
-            return None
-        return task_id
-    return None
+        return check_and_complete_task_if_all_subtasks_done(task_id, subtasks, jira_connection, latest_build_id)
+
+    return _acquire_task(build, task_is_done)
 
 
 def get_latest_build_with_completed_task(builds):
-    for build in builds:
-        build_tasks = get_build_tasks(build["id"])
-        for task in build_tasks:
-            if task.get("dueStatus", {}).get("key") == "COMPLETE":
-                return build
+    """
+    First build (in the given order) with a COMPLETED task. Task lookups are fetched
+    TESTRAY_WORKERS builds at a time, so an early hit doesn't pull the whole history.
+    """
+    with ThreadPoolExecutor(max_workers=TESTRAY_WORKERS) as executor:
+        for start in range(0, len(builds), TESTRAY_WORKERS):
+            window = builds[start:start + TESTRAY_WORKERS]
+            window_tasks = executor.map(lambda build: get_build_tasks(build["id"]), window)
+            for build, build_tasks in zip(window, window_tasks):
+                if any(_is_complete(task) for task in build_tasks):
+                    return build
     return None
 
 
@@ -705,19 +916,10 @@ def is_handled(result):
 
 
 def should_skip_result(error):
+    error = error or ""
     if "AssertionError" in error:
         return False
-
-    skip_error_keywords = [
-        "Failed prior to running test",
-        "PortalLogAssertorTest#testScanXMLLog",
-        "Skipped test",
-        "The build failed prior to running the test",
-        "test-portal-testsuite-upstream-downstream(master) timed out after",
-        "TEST_SETUP_ERROR",
-        "Unable to run test on CI"
-    ]
-    return any(keyword in (error or "") for keyword in skip_error_keywords)
+    return SKIP_ERROR_RE.search(error) is not None
 
 
 def build_flaky_result_metadata(latest_build_id, result, case_id, result_error):
@@ -789,38 +991,48 @@ def find_similar_open_issues(jira_connection, case_id, result_error, *, return_l
         If return_list=True: List[str]
         Else: Tuple[bool, dict or None]
     """
+    # Failures sharing a case and normalized error resolve to the same issues; memoize on that pair
+    return _find_similar_open_issues(jira_connection, case_id, normalize_error(result_error), return_list)
+
+
+def _issue_statuses(jira_connection, issue_keys):
+    """
+    Jira status names for issue_keys, from ISSUE_STATUSES; the unknown keys are fetched
+    together in one bulk search. Returns the shared {issue_key: status_name} dict.
+    """
+    unknown = [key for key in dict.fromkeys(issue_keys) if key not in ISSUE_STATUSES]
+    if unknown:
+        ISSUE_STATUSES.update(get_issue_statuses_by_keys(jira_connection, unknown))
+    return ISSUE_STATUSES
+
+
+@lru_cache(maxsize=None)
+def _find_similar_open_issues(jira_connection, case_id, result_error_norm, return_list):
     seen_issues = set()
     similar_open_issues = []
 
-    history = get_case_result_history_for_routine_not_passed(case_id)
-    result_error_norm = normalize_error(result_error)
+    # Only results with issues can match; their errors are embedded in one batch up front
+    history = [r for r in get_case_result_history_for_routine_not_passed(case_id) if r.get("issues")]
+    scores = error_similarity_scores(result_error_norm, [normalize_error(r.get("error", "")) for r in history])
 
-    for past_result in history:
-        issues_str = past_result.get("issues", "")
-        if not issues_str:
-            continue
+    statuses = _issue_statuses(
+        jira_connection, (key for r in history for key in _iter_issue_keys(r["issues"]))
+    )
 
-        issue_keys = [key.strip() for key in issues_str.split(",")]
+    for past_result, score in zip(history, scores):
         open_issues = []
 
-        for issue_key in issue_keys:
+        for issue_key in _iter_issue_keys(past_result["issues"]):
             if issue_key in seen_issues:
                 continue
-            try:
-                _, status = get_issue_status_by_key(jira_connection, issue_key)
-                if status != "Closed":
-                    open_issues.append(issue_key)
-                seen_issues.add(issue_key)
-            except Exception as e:
-                print(f"Error retrieving issue {issue_key}: {e}")
+            if statuses[issue_key] != "Closed":
+                open_issues.append(issue_key)
+            seen_issues.add(issue_key)
 
         if not open_issues:
             continue
 
-        history_error = past_result.get("error", "")
-        history_error_norm = normalize_error(history_error)
-
-        if are_errors_similar(result_error_norm, history_error_norm):
+        if score >= ERROR_SIMILARITY_THRESHOLD:
             if return_list:
                 similar_open_issues.extend(open_issues)
                 return similar_open_issues  # stop at first
@@ -861,36 +1073,25 @@ def detect_flakiness(case_id, current_error_norm, history_cache):
     if not history:
         return False, "no_history"
 
-    fail_count = 0
-    pass_count = 0
-    switch_count = 0
-    last_status = None
-    similar_error_failures = 0
-    unique_errors = set()
-
-    for idx, result in enumerate(history):
-        status = result.get("status")
-        raw_error = result.get("error", "")
-        error = normalize_error(raw_error)
-
-        if status in STATUS_FAILED_BLOCKED_TESTFIX:
-            fail_count += 1
-            unique_errors.add(error)
-            is_similar = are_errors_similar(current_error_norm, error)
-            if is_similar:
-                similar_error_failures += 1
-        elif status == "PASSED":
-            pass_count += 1
-
-        if last_status and last_status != status:
-            switch_count += 1
-        last_status = status
+    statuses = [result.get("status") for result in history]
+    failed_errors = [
+        normalize_error(result.get("error", ""))
+        for result, status in zip(history, statuses)
+        if status in FAILED_BLOCKED_TESTFIX_STATUSES
+    ]
+    fail_count = len(failed_errors)
+    pass_count = statuses.count("PASSED")
+    switch_count = sum(1 for previous, status in pairwise(statuses) if previous and previous != status)
 
     total = pass_count + fail_count
 
     if total < 5:
         return False, "insufficient_data"
 
+    # All failed errors are scored against the current one in a single batch
+    scores = error_similarity_scores(current_error_norm, failed_errors)
+    similar_error_failures = sum(score >= ERROR_SIMILARITY_THRESHOLD for score in scores)
+
     flakiness_score = switch_count / (total - 1)
     failure_rate = fail_count / total
     similar_error_ratio = similar_error_failures / fail_count
@@ -926,42 +1127,28 @@ def report_poshi_tests_decrease(start_of_quarter_count, current_count):
         )
 
 
-def is_automated_functional_test(c_id):
+@lru_cache(maxsize=4096)
+def _case_type_name_of_case(c_id):
+    """Case type name of a case; both predicates below ask for the same cases."""
     case_info = get_case_info(c_id)
-    case_type_id = case_info.get("r_caseTypeToCases_c_caseTypeId")
-    return get_case_type_name(case_type_id) == "Automated Functional Test"
+    return get_case_type_name(case_info.get("r_caseTypeToCases_c_caseTypeId"))
 
 
-def is_module_integration_test(c_id):
-    case_info = get_case_info(c_id)
-    case_type_id = case_info.get("r_caseTypeToCases_c_caseTypeId")
-    return get_case_type_name(case_type_id) == "Modules Integration Test"
-
+def is_automated_functional_test(c_id):
+    return _case_type_name_of_case(c_id) == "Automated Functional Test"
 
-def check_and_complete_task_if_all_subtasks_done(task_id, subtasks, jira_connection, latest_build_id):
-    all_complete = all(subtask.get("dueStatus", {}).get("key") == "COMPLETE" for subtask in subtasks)
 
-    if all_complete:
-        # Collect all unique issue keys from the completed subtasks
-        testray_issue_keys = set()
-        for subtask in subtasks:
-            issues_str = subtask.get("issues", "")
-            if issues_str:
-                testray_issue_keys.update(key.strip() for key in issues_str.split(','))
+def is_module_integration_test(c_id):
+    return _case_type_name_of_case(c_id) == "Modules Integration Test"
 
-        # Fetch open routine tasks from Jira
-        jql = "labels in ('hl_routine_tasks') AND labels not in ('test_fix') AND status = Open"
-        open_jira_issues = get_all_issues(jira_connection, jql, fields=["key"])
-        open_jira_issue_keys = {issue.key for issue in open_jira_issues}
 
-        # Find issues that are open in Jira but not present in our completed TestRay task
-        issues_to_close = open_jira_issue_keys - testray_issue_keys
+def check_and_complete_task_if_all_subtasks_done(task_id, subtasks, jira_connection, latest_build_id):
+    # Collect all unique issue keys from the subtasks, or None if any is still open
+    testray_issue_keys = _collect_issue_keys_if_all_complete(subtasks)
 
-        if issues_to_close:
-            build_hash = get_current_build_hash(latest_build_id)
-            print(f"ℹ Found {len(issues_to_close)} issues to close as they are not reproducible in this run.")
-            for issue_key in issues_to_close:
-                close_issue(jira_connection, issue_key, build_hash)
+    if testray_issue_keys is not None:
+        # Close open routine tasks in Jira that are not present in our completed TestRay task
+        _close_stale_routine_tasks(jira_connection, latest_build_id, testray_issue_keys)
 
         print(f"✔ All subtasks are complete, completing task {task_id}")
         complete_task(task_id)
@@ -971,14 +1158,26 @@ def check_and_complete_task_if_all_subtasks_done(task_id, subtasks, jira_connect
         return False  # Task still open
 
 
-def are_errors_similar(current_norm, history_norm, threshold=0.8):
+def error_similarity_scores(current_norm, candidate_norms):
+    """
+    Cosine similarity of one normalized error against many, with every distinct text
+    embedded in a single (cached) batch instead of one model call per pair.
+    """
+    if not candidate_norms:
+        return []
+
+    texts = list(dict.fromkeys([current_norm, *candidate_norms]))
+    embeddings = _encode_errors(texts)
+    # Unit vectors, so one matrix-vector product gives every cosine similarity
+    row = dict(zip(texts, (embeddings @ embeddings[0]).tolist()))
+    return [row[text] for text in candidate_norms]
+
+
+def are_errors_similar(current_norm, history_norm, threshold=ERROR_SIMILARITY_THRESHOLD):
     """
     Compare two error messages semantically using sentence embeddings.
     """
-    emb_a = model.encode(current_norm, convert_to_tensor=True)
-    emb_b = model.encode(history_norm, convert_to_tensor=True)
-    similarity = util.pytorch_cos_sim(emb_a, emb_b).item()
-    return similarity >= threshold
+    return error_similarity_scores(current_norm, [history_norm])[0] >= threshold
 
 
 def group_errors_by_type(unique_tasks):
@@ -989,16 +1188,16 @@ def group_errors_by_type(unique_tasks):
 
 
 def build_case_duration_lookup(unique_tasks, build_id):
-    raw_build_results = get_all_build_case_results(build_id)
+    raw_build_results = get_all_build_case_results(build_id, fields=("r_caseToCaseResult_c_caseId", "duration"))
     interested_case_ids = {
         int(item["case_id"]) for item in unique_tasks if item.get("case_id")
     }
 
     return {
-        int(item["r_caseToCaseResult_c_caseId"]): item.get("duration")
+        case_id: item.get("duration")
         for item in raw_build_results
-        if item.get("r_caseToCaseResult_c_caseId")
-           and int(item["r_caseToCaseResult_c_caseId"]) in interested_case_ids
+        if (raw_case_id := item.get("r_caseToCaseResult_c_caseId"))
+        and (case_id := int(raw_case_id)) in interested_case_ids
     }
 
 
@@ -1038,23 +1237,25 @@ def fetch_failure_url(case_result_id):
     return None
 
 
+@lru_cache(maxsize=None)
 def get_case_result_history_for_routine(case_id):
-    items = fetch_case_results(case_id, HEADLESS_ROUTINE_ID)
+    items = iter_case_results(case_id, HEADLESS_ROUTINE_ID)
     return sort_by_execution_date_desc(items)
 
 
+@lru_cache(maxsize=None)
 def get_case_result_history_for_routine_not_passed(case_id):
-    items = fetch_case_results(case_id, HEADLESS_ROUTINE_ID, status=STATUS_FAILED_BLOCKED_TESTFIX)
+    items = iter_case_results(case_id, HEADLESS_ROUTINE_ID, status=STATUS_FAILED_BLOCKED_TESTFIX)
     return sort_by_execution_date_desc(items)
 
 
-def sort_by_execution_date_desc(items):
-    def get_sort_key(item):
-        date_str = item.get("executionDate", "")
-        parsed_date = parse_execution_date(date_str)
-        return parsed_date or datetime.min
+def _execution_sort_key(item):
+    parsed_date = parse_execution_date(item.get("executionDate") or "")
+    return parsed_date or datetime.min
 
-    return sorted(items, key=get_sort_key, reverse=True)
+
+def sort_by_execution_date_desc(items):
+    return sorted(items, key=_execution_sort_key, reverse=True)
 
 
 def get_last_passing_result(entire_history, max_execution_date):
@@ -1066,34 +1267,16 @@ def get_last_passing_result(entire_history, max_execution_date):
             print("❌ Invalid max_due_date format")
             return None
 
-    last_passing = None
-    last_date = None
-
-    for item in entire_history:
-        if item.get("status") != status_passed:
-            continue
-
-        execution_date_str = item.get("executionDate")
-        if not execution_date_str:
-            continue
-
-        execution_date = parse_execution_date(execution_date_str)
-        if not execution_date or execution_date >= max_execution_date:
-            continue
-
-        if last_date is None or execution_date > last_date:
-            last_passing = item
-            last_date = execution_date
-
-    return last_passing
-
+    passing_before = (
+        (execution_date, item)
+        for item in entire_history
+        if item.get("status") == status_passed
+        and item.get("executionDate")
+        and (execution_date := parse_execution_date(item["executionDate"]))
+        and execution_date < max_execution_date
+    )
+    return max(passing_before, key=lambda pair: pair[0], default=(None, None))[1]
 
-def filter_case_result_history_by_build(history, build_id):
-    """Filter case result history by build ID."""
-    return [
-        item for item in history
-        if item.get("testrayBuildId") == build_id
-    ]
 
 def get_current_build_hash(build_id):
     build = get_build_info(build_id)
@@ -1,8 +1,15 @@
 #!/usr/bin/env python3
 
 from datetime import datetime
+from functools import lru_cache
 import re
 
+# Dynamic fragments stripped by normalize_error, compiled once
+TIMESTAMP_RE = re.compile(r'\d{4}-\d{2}-\d{2}[\sT]\d{2}:\d{2}:\d{2}')
+MEMORY_ADDRESS_RE = re.compile(r'0x[0-9A-Fa-f]+')
+DURATION_RE = re.compile(r'\d+\s*(ms|s|seconds|minutes|m)')
+QUOTED_RE = re.compile(r'".*?"')
+
 def format_duration(ms):
     """Convert milliseconds into human-readable duration."""
     if not isinstance(ms, (int, float)):
@@ -11,8 +18,11 @@ def format_duration(ms):
     seconds = int((ms % 60000) // 1000)
     return f"{minutes}m {seconds}s"
 
+@lru_cache(maxsize=1)
 def get_current_quarter_info():
     """
+    Computed once per process; the runs are far shorter than a quarter.
+
     Returns:
         quarter_start (datetime.date): Start date of the current quarter.
         quarter_number (int): Quarter number (1, 2, 3, or 4).
@@ -38,8 +48,12 @@ def get_current_quarter_info():
     quarter_start = datetime(year, start_month, 1).date()
     return quarter_start, quarter_number, year
 
+@lru_cache(maxsize=16384)
 def normalize_error(error):
-    """Normalize and clean error messages for comparison and pattern matching."""
+    """
+    Normalize and clean error messages for comparison and pattern matching.
+    Memoized: the same error text is normalized by scanning, grouping and similarity lookups.
+    """
     if not error:
         return ""
 
@@ -47,13 +61,14 @@ def normalize_error(error):
     error = ' '.join(error.strip().split())
 
     # Remove timestamps, memory addresses, test durations, or dynamic values
-    error = re.sub(r'\d{4}-\d{2}-\d{2}[\sT]\d{2}:\d{2}:\d{2}', '', error)  # timestamps
-    error = re.sub(r'0x[0-9A-Fa-f]+', '', error)  # memory addresses
-    error = re.sub(r'\d+\s*(ms|s|seconds|minutes|m)', '', error)  # durations
-    error = re.sub(r'".*?"', '"..."', error)  # replace quoted strings with placeholder
+    error = TIMESTAMP_RE.sub('', error)  # timestamps
+    error = MEMORY_ADDRESS_RE.sub('', error)  # memory addresses
+    error = DURATION_RE.sub('', error)  # durations
+    error = QUOTED_RE.sub('"..."', error)  # replace quoted strings with placeholder
 
     return error
 
+@lru_cache(maxsize=4096)
 def parse_execution_date(date_str):
     date_str = date_str.strip()
 
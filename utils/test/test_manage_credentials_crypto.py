@@ -0,0 +1,60 @@
+import os
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from Crypto.Cipher import PKCS1_OAEP
+from Crypto.PublicKey import RSA
+
+from liferay_utils.manageCredentialsCrypto import (
+    FOLDER_NAME,
+    decrypt_token,
+    get_credentials,
+    store_encrypted_token,
+)
+
+
+class ManageCredentialsCryptoTests(unittest.TestCase):
+
+    def setUp(self):
+        self.home = tempfile.TemporaryDirectory()
+        self.addCleanup(self.home.cleanup)
+        self.folder = Path(self.home.name) / FOLDER_NAME
+
+    def _file_mode(self, name):
+        return stat.S_IMODE(os.stat(self.folder / name).st_mode)
+
+    def test_store_and_decrypt_token_round_trip(self):
+        store_encrypted_token(self.folder, "secret-token")
+
+        self.assertEqual(decrypt_token(self.folder), "secret-token")
+        self.assertNotIn(b"secret-token", (self.folder / "token.gcm").read_bytes())
+
+    def test_key_and_token_are_owner_only(self):
+        store_encrypted_token(self.folder, "secret-token")
+
+        self.assertEqual(self._file_mode("key.bin"), 0o600)
+        self.assertEqual(self._file_mode("token.gcm"), 0o600)
+
+    def test_legacy_rsa_token_is_migrated(self):
+        self.folder.mkdir()
+        (self.folder / "user").write_text("jira-user\n")
+        private_key = RSA.generate(2048)
+        (self.folder / "private.pem").write_bytes(private_key.export_key())
+        (self.folder / "token.enc").write_bytes(
+            PKCS1_OAEP.new(private_key.publickey()).encrypt(b"legacy-token"))
+
+        environ = {key: value for key, value in os.environ.items() if key != "TOKEN"}
+        environ["HOME"] = self.home.name
+        with mock.patch.dict(os.environ, environ, clear=True):
+            self.assertEqual(get_credentials(), ("jira-user", "legacy-token"))
+
+        self.assertEqual(decrypt_token(self.folder), "legacy-token")
+        self.assertEqual(self._file_mode("key.bin"), 0o600)
+        self.assertEqual(self._file_mode("token.gcm"), 0o600)
+
+
+if __name__ == '__main__':
+    unittest.main()